@@ -0,0 +1,147 @@
+"""Batch transcribe every audio file in audio/ from a single Python process.
+
+The Whisper model is loaded once per worker instead of once per file, and
+files are spread over a pool of worker processes sized to the machine's
+cores. Each worker gets an equal share of the CPU threads.
+
+transcripts/manifest.json decides what to do: only new or changed audio,
+and transcripts that are missing or do not match their recorded hash, are
+transcribed. Pass --adopt-existing once to trust transcripts made before
+the manifest existed instead of redoing them.
+
+Usage:
+    python scripts/batch_transcribe.py [--workers N] [--model base] [--adopt-existing]
+"""
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from transcribe import DEFAULT_MODEL, init_worker, transcribe_in_worker, transcript_path
+from transcription_manifest import load_manifest, record_file, record_run, save_manifest, stale_reason
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUDIO_DIR = os.path.join(PROJECT_DIR, "audio")
+AUDIO_PATTERNS = ("*.mp3", "*.m4a", "*.wav", "*.mp4")
+
+
+def find_audio_files(audio_dir=AUDIO_DIR):
+    files = []
+    for pattern in AUDIO_PATTERNS:
+        files.extend(glob.glob(os.path.join(audio_dir, pattern)))
+    return sorted(files)
+
+
+def default_workers():
+    # Whisper on CPU scales well up to ~4 torch threads per file
+    return max(1, (os.cpu_count() or 1) // 4)
+
+
+def fmt_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+def report(audio_path, duration, elapsed):
+    rtf = elapsed / duration if duration else 0
+    print(f"✅  {os.path.basename(audio_path)}: {fmt_duration(duration)} audio in "
+          f"{fmt_duration(elapsed)} (RTF {rtf:.2f})")
+
+
+def batch_transcribe(workers=None, model_name=DEFAULT_MODEL, adopt_existing=False):
+    print("=== Batch Transcription ===")
+    print("Looking for audio files in audio/...\n")
+
+    manifest = load_manifest()
+    todo = []
+    for audio_path in find_audio_files():
+        name = os.path.basename(audio_path)
+        output_path = transcript_path(audio_path)
+        reason = stale_reason(manifest, audio_path, output_path)
+        if reason is None:
+            print(f"⏭️  Skipping {name} (unchanged since last transcription)")
+            continue
+        if reason == "existing transcript not in manifest" and adopt_existing:
+            record_file(manifest, audio_path, output_path, 0, 0, "unknown")
+            print(f"📎  Adopted existing transcript for {name}")
+            continue
+        print(f"🎙️  Queued {name} ({reason})")
+        todo.append(audio_path)
+    save_manifest(manifest)
+
+    if not todo:
+        print("No new audio files to transcribe.")
+        return []
+
+    workers = min(workers or default_workers(), len(todo))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"\n🎙️  Transcribing {len(todo)} file(s) with {workers} worker(s) × {threads} thread(s), model '{model_name}'\n")
+
+    results = []
+    failed = []
+    started_at = datetime.now()
+    run_start = time.perf_counter()
+
+    def finish(result):
+        audio_path, output_path, duration, elapsed = result
+        results.append(result)
+        record_file(manifest, audio_path, output_path, duration, elapsed, model_name)
+        save_manifest(manifest)
+        report(audio_path, duration, elapsed)
+
+    def fail(audio_path, error):
+        failed.append(audio_path)
+        print(f"❌  {os.path.basename(audio_path)}: {str(error)[:120]}")
+
+    if workers == 1:
+        init_worker(model_name, threads)
+        for audio_path in todo:
+            try:
+                result = transcribe_in_worker(audio_path)
+            except Exception as e:
+                fail(audio_path, e)
+                continue
+            finish(result)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(model_name, threads)) as pool:
+            futures = {pool.submit(transcribe_in_worker, path): path for path in todo}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    fail(futures[future], e)
+                    continue
+                finish(result)
+    wall = time.perf_counter() - run_start
+
+    audio_total = sum(r[2] for r in results)
+    run = record_run(manifest, started_at, len(results), audio_total, wall, workers, model_name)
+    save_manifest(manifest)
+    print(f"\n=== {len(results)} file(s) transcribed{f', {len(failed)} failed' if failed else ''} ===")
+    for audio_path in failed:
+        print(f"   ❌ {os.path.basename(audio_path)} (will be retried next run)")
+    print(f"Audio: {fmt_duration(audio_total)} | Wall clock: {fmt_duration(wall)} | "
+          f"Overall RTF {wall / audio_total if audio_total else 0:.2f}")
+    print(f"Throughput: {run['audio_seconds_per_second']}× real time, {run['files_per_hour']} files/hour")
+    print("\nNext steps:")
+    print("  Process each transcript in chronological order (one per day):")
+    print("  python scripts/process_transcript.py transcripts/class_01_topic.txt")
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Transcribe all new audio in audio/ with one model load per worker.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"Worker processes (default: cores // 4 = {default_workers()})")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Whisper model (default: {DEFAULT_MODEL})")
+    parser.add_argument("--adopt-existing", action="store_true",
+                        help="Record transcripts made before the manifest existed instead of redoing them")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    batch_transcribe(workers=args.workers, model_name=args.model, adopt_existing=args.adopt_existing)
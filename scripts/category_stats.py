@@ -0,0 +1,57 @@
+"""Per-error_category caught/missed counts kept in flaw_category_stats.
+
+The webhook adds to these counts (via the record_flaw_answer function) every
+time a Spot the Flaw poll is answered, so deliver_sprint.py reads a few
+dozen rows instead of every missed daily_log entry. `backfill` rebuilds the
+table from daily_log. Run it once after applying the migration, or any time
+the counts look off.
+
+Usage:
+    python scripts/category_stats.py backfill
+    python scripts/category_stats.py show
+"""
+import argparse
+import time
+
+from clients import supabase
+
+
+def load_stats():
+    return supabase.table("flaw_category_stats")\
+        .select("error_category, missed, caught")\
+        .order("missed", desc=True)\
+        .execute().data or []
+
+
+def backfill():
+    start = time.perf_counter()
+    categories = supabase.rpc("rebuild_flaw_category_stats").execute().data
+    print(f"✅ flaw_category_stats rebuilt from daily_log: {categories} categories "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+def show():
+    rows = load_stats()
+    if not rows:
+        print("flaw_category_stats is empty. Run: python scripts/category_stats.py backfill")
+        return
+    width = max(len(r["error_category"]) for r in rows)
+    print(f"{'error_category':<{width}}  missed  caught")
+    for row in rows:
+        print(f"{row['error_category']:<{width}}  {row['missed']:>6}  {row['caught']:>6}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Maintain the per-category Spot the Flaw rollup.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("backfill")
+    sub.add_parser("show")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "backfill":
+        backfill()
+    else:
+        show()
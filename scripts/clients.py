@@ -0,0 +1,200 @@
+"""Shared Supabase, Telegram and Gemini clients, created on first use.
+
+Scripts import the clients they need instead of building their own at import
+time:
+
+    from clients import supabase, bot
+
+Each name is a lazy proxy. The real client (and the env vars it needs) is only
+touched on first attribute access, so a cron job pays only for the clients it
+actually uses. Supabase requests go through one keep-alive httpx pool, and
+Telegram through a pooled HTTPXRequest. All three record request counts and
+latency (for Gemini, per generate_content call; a streamed call counts until
+its last chunk); print summary() at the end of a run to see them.
+"""
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+POOL_SIZE = 10
+KEEPALIVE_SECONDS = 30
+TIMEOUT_SECONDS = 30
+
+
+class LatencyStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds, ok=True):
+        with self.lock:
+            self.requests += 1
+            self.errors += 0 if ok else 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def connected(self):
+        with self.lock:
+            self.connections += 1
+
+    def summary(self, name):
+        if not self.requests:
+            return f"{name}: no requests"
+        avg_ms = self.total_seconds / self.requests * 1000
+        text = f"{name}: {self.requests} request(s), avg {avg_ms:.0f} ms, max {self.max_seconds * 1000:.0f} ms"
+        if self.connections:
+            text += f", {self.connections} connection(s) opened"
+        if self.errors:
+            text += f", {self.errors} error(s)"
+        return text
+
+
+stats = {"supabase": LatencyStats(), "telegram": LatencyStats(), "gemini": LatencyStats()}
+
+
+class LazyClient:
+    """Builds the wrapped client on first attribute access; thread-safe."""
+
+    def __init__(self, name, factory):
+        self._name = name
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    @property
+    def created(self):
+        return self._client is not None
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def __repr__(self):
+        return f"<lazy {self._name} client{'' if self.created else ', not created yet'}>"
+
+
+def _env(name):
+    return os.environ[name].strip()
+
+
+def _trace_supabase(event_name, info):
+    if event_name == "connection.connect_tcp.complete":
+        stats["supabase"].connected()
+
+
+def _on_supabase_request(request):
+    request.extensions["trace"] = _trace_supabase
+    request.extensions["started_at"] = time.perf_counter()
+
+
+def _on_supabase_response(response):
+    started = response.request.extensions.get("started_at")
+    if started is not None:
+        stats["supabase"].record(time.perf_counter() - started, response.status_code < 400)
+
+
+def _make_supabase():
+    import httpx
+    from supabase import ClientOptions, create_client
+
+    http = httpx.Client(
+        limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE,
+                            keepalive_expiry=KEEPALIVE_SECONDS),
+        timeout=TIMEOUT_SECONDS,
+        event_hooks={"request": [_on_supabase_request], "response": [_on_supabase_response]},
+    )
+    try:
+        options = ClientOptions(httpx_client=http)
+    except TypeError:
+        # supabase-py before httpx_client injection: each sub-client keeps its own keep-alive pool
+        http.close()
+        options = ClientOptions()
+    return create_client(_env("SUPABASE_URL"), _env("SUPABASE_KEY"), options=options)
+
+
+def _make_bot():
+    from telegram import Bot
+    from telegram.request import HTTPXRequest
+
+    class TimedRequest(HTTPXRequest):
+        async def do_request(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                status, payload = await super().do_request(*args, **kwargs)
+            except Exception:
+                stats["telegram"].record(time.perf_counter() - start, ok=False)
+                raise
+            stats["telegram"].record(time.perf_counter() - start, status < 400)
+            return status, payload
+
+    request = TimedRequest(connection_pool_size=POOL_SIZE, read_timeout=TIMEOUT_SECONDS)
+    return Bot(token=_env("TELEGRAM_TOKEN"), request=request)
+
+
+class _TimedModels:
+    """Wraps genai's `client.models`, timing each generate call into stats["gemini"]."""
+
+    def __init__(self, models):
+        self._models = models
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+    def generate_content(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self._models.generate_content(*args, **kwargs)
+        except Exception:
+            stats["gemini"].record(time.perf_counter() - start, ok=False)
+            raise
+        stats["gemini"].record(time.perf_counter() - start)
+        return response
+
+    def generate_content_stream(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            yield from self._models.generate_content_stream(*args, **kwargs)
+        except Exception:
+            stats["gemini"].record(time.perf_counter() - start, ok=False)
+            raise
+        stats["gemini"].record(time.perf_counter() - start)
+
+
+class _TimedGemini:
+    def __init__(self, client):
+        self._client = client
+        self.models = _TimedModels(client.models)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def _make_gemini():
+    from google import genai
+
+    return _TimedGemini(genai.Client(api_key=_env("GEMINI_API_KEY")))
+
+
+supabase = LazyClient("supabase", _make_supabase)
+bot = LazyClient("telegram", _make_bot)
+gemini = LazyClient("gemini", _make_gemini)
+
+
+def summary():
+    """One line per client that was actually created."""
+    lines = [stats[c._name].summary(c._name) for c in (supabase, bot, gemini) if c.created]
+    return "\n".join(lines) if lines else "No Supabase, Telegram or Gemini client created."
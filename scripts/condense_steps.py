@@ -1,13 +1,14 @@
 """One-time script to condense existing DB problems with >10 steps to ≤10 steps."""
-import os, json, time
+import json, time
 from dotenv import load_dotenv
-from supabase import create_client
-from google import genai
+
+import clients
+from clients import gemini, supabase as sb
+from llm_cache import cache
 
 load_dotenv()
 
-sb = create_client(os.environ["SUPABASE_URL"].strip(), os.environ["SUPABASE_KEY"].strip())
-client = genai.Client(api_key=os.environ["GEMINI_API_KEY"].strip())
+MODEL = "gemini-2.5-flash"
 
 r = sb.table("qa_flaw_deck").select("id, solution_steps, flawed_step_number, original_problem").execute()
 over_limit = [p for p in r.data if isinstance(p["solution_steps"], list) and len(p["solution_steps"]) > 10]
@@ -16,14 +17,19 @@ print(f"Condensing {len(over_limit)} problems with >10 steps...\n")
 
 def call_with_retry(prompt, max_retries=3):
     """Call LLM with rate-limit retry."""
+    cached = cache.get(MODEL, prompt)
+    if cached is not None:
+        return json.loads(cached)
     for attempt in range(max_retries):
         try:
-            response = client.models.generate_content(model="gemini-2.5-flash", contents=prompt)
+            response = gemini.models.generate_content(model=MODEL, contents=prompt)
             text = response.text.strip()
             if text.startswith("```"):
                 text = text.split("\n", 1)[1]
                 text = text.rsplit("```", 1)[0]
-            return json.loads(text)
+            result = json.loads(text)
+            cache.put(MODEL, prompt, text)
+            return result
         except Exception as e:
             if "429" in str(e) or "503" in str(e):
                 wait = 2 ** attempt * 10
@@ -91,4 +97,5 @@ Return only valid JSON."""
     else:
         print(f"  WARN Still over 10 after 3 rounds, skipping")
 
-print("\nDone.")
+print(f"\nDone. {cache.summary()}")
+print(clients.summary())
@@ -0,0 +1,85 @@
+"""Batched, idempotent writes into qa_flaw_deck.
+
+Every record carries a content_hash of source_file + original_problem, backed
+by a unique index (supabase/migrations/20261016000100_qa_flaw_deck_content_hash.sql).
+Records are upserted in chunks with ON CONFLICT DO NOTHING, so re-running a
+transcript never creates duplicate rows and never resets the status of a
+problem that was already delivered.
+"""
+import hashlib
+import time
+
+CHUNK_SIZE = 50
+
+
+def content_hash(record):
+    # Same key as the migration's backfill, which coalesces NULLs to ''
+    key = f"{record.get('source_file') or ''}\n{record.get('original_problem') or ''}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class DeckWriter:
+    """Collects records and upserts them into qa_flaw_deck a chunk at a time."""
+
+    def __init__(self, supabase, chunk_size=CHUNK_SIZE, max_retries=5):
+        self.supabase = supabase
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.pending = []
+        self.inserted = 0
+        self.duplicates = 0
+        self.round_trips = 0
+        self.failed = []
+
+    def add(self, record):
+        """Queue a record; flushes automatically once a full chunk is waiting."""
+        self.pending.append(dict(record, content_hash=content_hash(record)))
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def extend(self, records):
+        for record in records:
+            self.add(record)
+
+    def flush(self):
+        """Write everything pending. Returns the records that still failed after retries."""
+        failed = []
+        while self.pending:
+            chunk = self._dedupe(self.pending[:self.chunk_size])
+            del self.pending[:self.chunk_size]
+            if not self._write_chunk(chunk):
+                failed.extend(chunk)
+        self.failed.extend(failed)
+        return failed
+
+    @staticmethod
+    def _dedupe(chunk):
+        seen = {}
+        for row in chunk:
+            seen.setdefault(row["content_hash"], row)
+        return list(seen.values())
+
+    def _write_chunk(self, chunk):
+        for attempt in range(self.max_retries):
+            try:
+                self.round_trips += 1
+                result = self.supabase.table("qa_flaw_deck")\
+                    .upsert(chunk, on_conflict="content_hash", ignore_duplicates=True)\
+                    .execute()
+                written = len(result.data or [])
+                self.inserted += written
+                self.duplicates += len(chunk) - written
+                return True
+            except Exception as e:
+                wait = 2 ** attempt * 5  # 5s, 10s, 20s, 40s, 80s
+                print(f"  ⚠️ Upsert of {len(chunk)} record(s) failed (attempt {attempt+1}/{self.max_retries}): {str(e)[:80]}")
+                if attempt < self.max_retries - 1:
+                    print(f"  ⏳ Retrying chunk in {wait}s...")
+                    time.sleep(wait)
+        return False
+
+    def summary(self):
+        text = f"{self.inserted} inserted, {self.duplicates} already in deck ({self.round_trips} round trip(s))"
+        if self.failed:
+            text += f", {len(self.failed)} failed"
+        return text
@@ -3,17 +3,15 @@ import json
 import asyncio
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from supabase import create_client
-from telegram import Bot
 from dotenv import load_dotenv
 
+import clients
+from clients import bot, supabase
+
 load_dotenv()
 
 IST = ZoneInfo("Asia/Kolkata")
-FLAW_DAY_STATE_KEY = "flaw_day_state_v1"
 
-supabase = create_client(os.environ["SUPABASE_URL"].strip(), os.environ["SUPABASE_KEY"].strip())
-bot = Bot(token=os.environ["TELEGRAM_TOKEN"].strip())
 chat_id = os.environ["TELEGRAM_CHAT_ID"].strip()
 
 
@@ -21,19 +19,14 @@ def _today_key():
     return datetime.now(IST).date().isoformat()
 
 
-def _get_day_state():
-    result = supabase.table("settings")\
-        .select("value")\
-        .eq("key", FLAW_DAY_STATE_KEY)\
+def _get_day_state(day):
+    """Today's row from flaw_day_state (one row per IST date), or {}."""
+    result = supabase.table("flaw_day_state")\
+        .select("*")\
+        .eq("day", day)\
+        .limit(1)\
         .execute()
-
-    if not result.data or not result.data[0].get("value"):
-        return {}
-
-    try:
-        return json.loads(result.data[0]["value"])
-    except json.JSONDecodeError:
-        return {}
+    return result.data[0] if result.data else {}
 
 def _format_axiom(axiom_raw, framing):
     """Format the axiom as a Cognitive Anchor message.
@@ -71,7 +64,7 @@ def _format_axiom(axiom_raw, framing):
         return msg
 
 async def deliver_axiom():
-    state = _get_day_state().get(_today_key(), {})
+    state = _get_day_state(_today_key())
     problem_id = state.get("most_recent_missed_problem_id") or state.get("most_recent_answered_problem_id")
     axiom = state.get("most_recent_missed_axiom") or state.get("most_recent_answered_axiom")
     if not axiom or not problem_id:
@@ -100,3 +93,4 @@ async def deliver_axiom():
     print(f"Axiom delivered. Framing: {'caught' if 'spotted' in framing else 'missed' if 'caught you' in framing else 'neutral'}")
 
 asyncio.run(deliver_axiom())
+print(clients.summary())
@@ -1,21 +1,19 @@
 import os
-import json
 import asyncio
-import random
 from datetime import datetime, timedelta
 from collections import Counter
 from zoneinfo import ZoneInfo
-from supabase import create_client
-from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from dotenv import load_dotenv
 
+import clients
+from clients import bot, supabase
+from sprint_pool import SprintPool
+
 load_dotenv()
 
 IST = ZoneInfo("Asia/Kolkata")
-FLAW_DAY_STATE_KEY = "flaw_day_state_v1"
 
-supabase = create_client(os.environ["SUPABASE_URL"].strip(), os.environ["SUPABASE_KEY"].strip())
-bot = Bot(token=os.environ["TELEGRAM_TOKEN"].strip())
 chat_id = os.environ["TELEGRAM_CHAT_ID"].strip()
 
 # Error category → sprint category mapping
@@ -42,24 +40,20 @@ def escape_md(text):
         text = text.replace(ch, f'\\{ch}')
     return text
 
-def _get_day_state():
-    result = supabase.table("settings")\
-        .select("value")\
-        .eq("key", FLAW_DAY_STATE_KEY)\
+def _get_day_state(day, columns="*"):
+    """One day's row from flaw_day_state (keyed by IST date), or {}."""
+    result = supabase.table("flaw_day_state")\
+        .select(columns)\
+        .eq("day", day)\
+        .limit(1)\
         .execute()
-
-    if not result.data or not result.data[0].get("value"):
-        return {}
-
-    try:
-        return json.loads(result.data[0]["value"])
-    except json.JSONDecodeError:
-        return {}
+    return result.data[0] if result.data else {}
 
 def get_yesterday_miss():
     """Use the most recent missed flaw from yesterday, if any."""
     yesterday = (datetime.now(IST).date() - timedelta(days=1)).isoformat()
-    error_cat = _get_day_state().get(yesterday, {}).get("most_recent_missed_error_category", "")
+    error_cat = _get_day_state(yesterday, "most_recent_missed_error_category")\
+        .get("most_recent_missed_error_category") or ""
     if not error_cat:
         return None
     sprint_cat = CATEGORY_MAP.get(error_cat)
@@ -68,83 +62,27 @@ def get_yesterday_miss():
     return sprint_cat
 
 def get_weak_categories():
-    """Read all missed Spot the Flaw errors and find weakest categories."""
-    logs = supabase.table("daily_log")\
-        .select("*, qa_flaw_deck(error_category)")\
-        .eq("caught", False)\
+    """Find the weakest sprint categories from the per-category miss rollup."""
+    stats = supabase.table("flaw_category_stats")\
+        .select("error_category, missed")\
+        .gt("missed", 0)\
         .execute()
 
-    if not logs.data:
+    if not stats.data:
         return []
 
-    sprint_cats = []
-    for log in logs.data:
-        if log.get("qa_flaw_deck"):
-            error_cat = log["qa_flaw_deck"].get("error_category", "")
-            sprint_cat = CATEGORY_MAP.get(error_cat)
-            if sprint_cat:
-                sprint_cats.append(sprint_cat)
+    misses = Counter()
+    for row in stats.data:
+        sprint_cat = CATEGORY_MAP.get(row["error_category"])
+        if sprint_cat:
+            misses[sprint_cat] += row["missed"]
 
-    if not sprint_cats:
-        return []
-
-    return [cat for cat, _ in Counter(sprint_cats).most_common(2)]
-
-def select_questions(weak_categories, yesterday_miss_cat):
-    """Select 7 questions with yesterday-miss guarantee + weak spot weighting."""
-    questions = []
-    existing_ids = []
-
-    # Priority 1: If yesterday was missed, guarantee 2 from that category
-    if yesterday_miss_cat:
-        result = supabase.table("math_sprints")\
-            .select("*")\
-            .eq("category", yesterday_miss_cat)\
-            .order("times_attempted")\
-            .limit(10)\
-            .execute()
-        if result.data:
-            pool = random.sample(result.data, min(2, len(result.data)))
-            questions.extend(pool)
-            existing_ids = [q["id"] for q in questions]
-
-    # Priority 2: Fill from weak categories (if any slots left)
-    if len(questions) < 3 and weak_categories:
-        for cat in weak_categories[:2]:
-            if len(questions) >= 3:
-                break
-            result = supabase.table("math_sprints")\
-                .select("*")\
-                .eq("category", cat)\
-                .order("times_attempted")\
-                .limit(10)\
-                .execute()
-            if result.data:
-                pool = [q for q in result.data if q["id"] not in existing_ids]
-                if pool:
-                    questions.append(random.choice(pool))
-                    existing_ids.append(questions[-1]["id"])
-
-    # Priority 3: Fill to 7 with random least-attempted questions
-    needed = 7 - len(questions)
-    all_available = supabase.table("math_sprints")\
-        .select("*")\
-        .order("times_attempted")\
-        .limit(50)\
-        .execute()
-
-    if all_available.data:
-        pool = [q for q in all_available.data if q["id"] not in existing_ids]
-        random.shuffle(pool)
-        questions.extend(pool[:needed])
-
-    random.shuffle(questions)
-    return questions[:7]
+    return [cat for cat, _ in misses.most_common(2)]
 
 async def deliver():
     yesterday_miss = get_yesterday_miss()
     weak_cats = get_weak_categories()
-    questions = select_questions(weak_cats, yesterday_miss)
+    questions = SprintPool.load(supabase).select(weak_cats, yesterday_miss)
 
     if not questions:
         await bot.send_message(
@@ -154,7 +92,12 @@ async def deliver():
         print("No questions available.")
         return
 
-    first_q = questions[0]
+    # The pool only carries id/category; fetch the text of the one question shown now
+    first_q = supabase.table("math_sprints")\
+        .select("id, question_text, options")\
+        .eq("id", questions[0]["id"])\
+        .single()\
+        .execute().data
     options = first_q["options"]
 
     # Create session
@@ -207,29 +150,6 @@ async def deliver():
         .eq("id", session_id)\
         .execute()
 
-    # ── Session cleanup: delete sessions older than 7 days ──
-    cutoff = (datetime.now() - timedelta(days=7)).isoformat()
-
-    # First find old session IDs
-    old_sessions = supabase.table("sprint_sessions")\
-        .select("id")\
-        .lt("created_at", cutoff)\
-        .execute()
-
-    if old_sessions.data:
-        old_ids = [s["id"] for s in old_sessions.data]
-        # Delete child sprint_logs first (FK constraint)
-        for sid in old_ids:
-            supabase.table("sprint_logs")\
-                .delete()\
-                .eq("session_id", sid)\
-                .execute()
-        # Then delete the sessions
-        supabase.table("sprint_sessions")\
-            .delete()\
-            .lt("created_at", cutoff)\
-            .execute()
-
     print(f"Sprint delivered. Session: {session_id}")
     print(f"Questions: {len(questions)} ({', '.join(q['category'] for q in questions)})")
     if yesterday_miss:
@@ -238,3 +158,4 @@ async def deliver():
         print(f"Weak categories targeted: {', '.join(weak_cats)}")
 
 asyncio.run(deliver())
+print(clients.summary())
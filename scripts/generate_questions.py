@@ -1,14 +1,12 @@
-import os
 import json
 import random
-from google import genai
-from supabase import create_client
 from dotenv import load_dotenv
 
-load_dotenv()
+import clients
+from clients import gemini, supabase
+from llm_cache import cache
 
-client = genai.Client(api_key=os.environ["GEMINI_API_KEY"].strip())
-supabase = create_client(os.environ["SUPABASE_URL"].strip(), os.environ["SUPABASE_KEY"].strip())
+load_dotenv()
 
 # ─────────────────────────────────────────────
 # STEP 1: Generate raw math pairs programmatically
@@ -278,16 +276,22 @@ Batch:
 {batch}
 """
 
+MODEL = "gemini-3-flash-preview"
+
 def call_gemini(prompt, max_retries=5):
     import time
+    cached = cache.get(MODEL, prompt)
+    if cached is not None:
+        return cached
     for attempt in range(max_retries):
         try:
-            response = client.models.generate_content(
-                model="gemini-3-flash-preview", contents=prompt
+            response = gemini.models.generate_content(
+                model=MODEL, contents=prompt
             )
             text = response.text.strip()
             if text.startswith("```"):
                 text = text.split("\n", 1)[1].rsplit("```", 1)[0]
+            cache.put(MODEL, prompt, text)
             return text
         except Exception as e:
             if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
@@ -307,8 +311,13 @@ def wrap_with_context(raw_batch):
             "correct": q["correct_answer"]
         })
     
-    text = call_gemini(CONTEXT_PROMPT.format(batch=json.dumps(formatted, indent=2)))
-    return json.loads(text)
+    prompt = CONTEXT_PROMPT.format(batch=json.dumps(formatted, indent=2))
+    text = call_gemini(prompt)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        cache.discard(MODEL, prompt)
+        raise
 
 # ─────────────────────────────────────────────
 # STEP 3: Insert to Supabase
@@ -342,6 +351,8 @@ def main():
                     "question_text": q["raw_question"]
                 })
 
+    print(cache.summary())
+    print(clients.summary())
     print(f"\nSample output (first 3 questions):")
     for item in all_wrapped[:3]:
         q = raw_questions[item["original_index"]]
@@ -1,13 +1,13 @@
 import os
 import asyncio
-from supabase import create_client
-from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from dotenv import load_dotenv
 
+import clients
+from clients import bot, supabase
+
 load_dotenv()
 
-supabase = create_client(os.environ["SUPABASE_URL"].strip(), os.environ["SUPABASE_KEY"].strip())
-bot = Bot(token=os.environ["TELEGRAM_TOKEN"].strip())
 chat_id = os.environ["TELEGRAM_CHAT_ID"].strip()
 
 async def graveyard_nudge():
@@ -57,3 +57,4 @@ async def graveyard_nudge():
     print(f"Graveyard nudge sent: {problem['id'][:8]}... ({problem['error_category']})")
 
 asyncio.run(graveyard_nudge())
+print(clients.summary())
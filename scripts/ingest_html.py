@@ -0,0 +1,156 @@
+"""Import transcripts from the NotebookLM source exports, no Whisper needed.
+
+Each `Source_<audio name>.html` in `NoteBook_QA Class 1-15 - Feb20/` holds
+the class transcript as `div.paragraph` elements under `source-content`.
+Files are parsed in parallel, one per worker process, and each one is fed to
+the parser in 64 KB chunks. A paragraph is written to the output as soon as
+it closes, so memory stays bounded by a single paragraph.
+
+Output goes to transcripts/<audio name>.txt (the same path Whisper would
+write) and is recorded in transcripts/manifest.json under "imports", so
+batch_transcribe.py will not redo it. Existing transcripts are left alone
+unless --force is given; unchanged exports are skipped.
+
+Usage:
+    python scripts/ingest_html.py [--source-dir DIR] [--workers N] [--force]
+"""
+import argparse
+import glob
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from html.parser import HTMLParser
+
+from transcription_manifest import PROJECT_DIR, file_sha256, load_manifest, record_import, save_manifest
+
+SOURCE_DIR = os.path.join(PROJECT_DIR, "NoteBook_QA Class 1-15 - Feb20")
+TRANSCRIPTS_DIR = os.path.join(PROJECT_DIR, "transcripts")
+CHUNK_BYTES = 64 * 1024
+
+
+class SourceContentParser(HTMLParser):
+    """Streams the text of every `div.paragraph` to `write` as each paragraph closes."""
+
+    def __init__(self, write):
+        super().__init__(convert_charrefs=True)
+        self.write = write
+        self.depth = 0  # open divs inside the current paragraph; 0 = not in a paragraph
+        self.parts = []
+        self.paragraphs = 0
+        self.chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "div":
+            return
+        if self.depth:
+            self.depth += 1
+        elif "paragraph" in (dict(attrs).get("class") or "").split():
+            self.depth = 1
+
+    def handle_endtag(self, tag):
+        if tag != "div" or not self.depth:
+            return
+        self.depth -= 1
+        if self.depth == 0:
+            text = re.sub(r"\s+", " ", "".join(self.parts)).strip()
+            self.parts = []
+            if text:
+                self.write(text + "\n")
+                self.paragraphs += 1
+                self.chars += len(text)
+
+    def handle_data(self, data):
+        if self.depth:
+            self.parts.append(data)
+
+
+def audio_name(html_path):
+    """`Source_qa_dec20.mp3.html` → `qa_dec20.mp3`."""
+    name = os.path.basename(html_path)
+    if name.startswith("Source_"):
+        name = name[len("Source_"):]
+    return name[:-len(".html")] if name.endswith(".html") else name
+
+
+def output_path(html_path):
+    return os.path.join(TRANSCRIPTS_DIR, os.path.splitext(audio_name(html_path))[0] + ".txt")
+
+
+def ingest_file(html_path):
+    """Parse one export into its transcript. Runs in a worker process."""
+    out = output_path(html_path)
+    tmp_path = out + ".partial"
+    start = time.perf_counter()
+    with open(html_path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+        parser = SourceContentParser(dst.write)
+        for chunk in iter(lambda: src.read(CHUNK_BYTES), ""):
+            parser.feed(chunk)
+        parser.close()
+    if not parser.paragraphs:
+        os.remove(tmp_path)
+        raise ValueError("no transcript paragraphs found")
+    os.replace(tmp_path, out)
+    return html_path, out, parser.paragraphs, parser.chars, time.perf_counter() - start
+
+
+def find_exports(source_dir=SOURCE_DIR):
+    return sorted(glob.glob(os.path.join(source_dir, "*.html")))
+
+
+def ingest(source_dir=SOURCE_DIR, workers=None, force=False):
+    print("=== HTML Transcript Import ===")
+    os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
+    manifest = load_manifest()
+    todo = []
+    for html_path in find_exports(source_dir):
+        name, out = audio_name(html_path), output_path(html_path)
+        imported = manifest["imports"].get(name)
+        if imported and os.path.exists(out) and imported["source_sha256"] == file_sha256(html_path) \
+                and imported["output_sha256"] == file_sha256(out):
+            print(f"⏭️  {name}: already imported")
+        elif os.path.exists(out) and not imported and not force:
+            print(f"⏭️  {name}: {os.path.relpath(out, PROJECT_DIR)} already exists (use --force to replace it)")
+        else:
+            todo.append(html_path)
+
+    if not todo:
+        print("\nNothing to import.")
+        return
+
+    workers = workers or min(len(todo), os.cpu_count() or 1)
+    print(f"\nImporting {len(todo)} export(s) with {workers} worker(s)...\n")
+    started = time.perf_counter()
+    imported = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(ingest_file, path): path for path in todo}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                html_path, out, paragraphs, chars, elapsed = future.result()
+            except Exception as e:
+                print(f"❌  {os.path.basename(path)}: {e}")
+                failed += 1
+                continue
+            record_import(manifest, audio_name(html_path), html_path, out, elapsed)
+            imported += 1
+            print(f"✅  {os.path.relpath(out, PROJECT_DIR)}: {paragraphs} paragraphs, {chars:,} chars "
+                  f"in {elapsed:.2f}s")
+    save_manifest(manifest)
+    print(f"\n{imported} imported, {failed} failed in {time.perf_counter() - started:.1f}s.")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Import transcripts from NotebookLM HTML source exports.")
+    parser.add_argument("--source-dir", default=SOURCE_DIR,
+                        help="Folder of Source_*.html exports (default: NoteBook_QA Class 1-15 - Feb20/)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallel parser processes (default: one per file, up to the CPU count)")
+    parser.add_argument("--force", action="store_true",
+                        help="Replace transcripts that already exist (e.g. earlier Whisper output)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    ingest(args.source_dir, args.workers, args.force)
@@ -0,0 +1,113 @@
+"""Persistent on-disk cache for Gemini responses, shared by every script.
+
+Entries are keyed by sha256(model + prompt), so a byte-identical prompt to the
+same model is answered from disk. The store is size-bounded and evicts the
+least recently used entries first.
+
+Environment:
+    GEMINI_CACHE_BYPASS=1   ignore cached answers (fresh answers are still stored)
+    GEMINI_CACHE_MAX_MB=N   size bound for the cache file (default 200)
+    GEMINI_CACHE_PATH=...   override the cache location
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(PROJECT_DIR, ".cache", "gemini_responses.sqlite3")
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_PATH, max_bytes=200 * 1024 * 1024, bypass=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self._conn = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            path=os.environ.get("GEMINI_CACHE_PATH", DEFAULT_PATH),
+            max_bytes=int(float(os.environ.get("GEMINI_CACHE_MAX_MB", "200")) * 1024 * 1024),
+            bypass=os.environ.get("GEMINI_CACHE_BYPASS", "").strip().lower() in ("1", "true", "yes"),
+        )
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "create table if not exists responses ("
+                " key text primary key, model text, response text,"
+                " size integer, last_used real)"
+            )
+            self._conn.execute("create index if not exists responses_last_used on responses(last_used)")
+        return self._conn
+
+    @staticmethod
+    def key(model, prompt):
+        return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, model, prompt):
+        """Return the cached response text, or None on a miss (or when bypassed)."""
+        if self.bypass:
+            self.misses += 1
+            return None
+        key = self.key(model, prompt)
+        with self.lock:
+            row = self.conn.execute("select response from responses where key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("update responses set last_used = ? where key = ?", (time.time(), key))
+            self.conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, model, prompt, response):
+        size = len(response.encode("utf-8"))
+        with self.lock:
+            self.conn.execute(
+                "insert or replace into responses (key, model, response, size, last_used) values (?, ?, ?, ?, ?)",
+                (self.key(model, prompt), model, response, size, time.time()),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def discard(self, model, prompt):
+        """Drop an entry, e.g. when the cached answer turned out to be unusable JSON."""
+        with self.lock:
+            self.conn.execute("delete from responses where key = ?", (self.key(model, prompt),))
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("select coalesce(sum(size), 0) from responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.conn.execute("select key, size from responses order by last_used").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("delete from responses where key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = f" ({self.hits / lookups:.0%} hit rate)" if lookups else ""
+        text = f"Gemini cache: {self.hits} hits, {self.misses} misses{rate}"
+        if self.evictions:
+            text += f", {self.evictions} evicted"
+        if self.bypass:
+            text += " [bypassed]"
+        return text
+
+
+cache = ResponseCache.from_env()
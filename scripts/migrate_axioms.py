@@ -8,17 +8,15 @@ Usage:
 Requires: SUPABASE_URL, SUPABASE_KEY, GEMINI_API_KEY env vars (or .env file)
 """
 
-import os
 import json
 import time
-from supabase import create_client
-from google import genai
 from dotenv import load_dotenv
 
-load_dotenv()
+import clients
+from clients import gemini, supabase
+from llm_cache import cache
 
-supabase = create_client(os.environ["SUPABASE_URL"].strip(), os.environ["SUPABASE_KEY"].strip())
-client = genai.Client(api_key=os.environ["GEMINI_API_KEY"].strip())
+load_dotenv()
 
 CONVERSION_PROMPT = """You are given a math problem, its error category, and a legacy "trap axiom" 
 (a single sentence describing the underlying rule being violated).
@@ -36,15 +34,21 @@ Return ONLY a valid JSON object with exactly these 3 keys:
 
 Return only valid JSON. No text outside the JSON."""
 
+MODEL = "gemini-3-flash-preview"
+
 
 def convert_axiom(axiom, category, problem, max_retries=3):
     """Call Gemini to convert a string axiom into a 3-part JSON."""
     prompt = CONVERSION_PROMPT.format(axiom=axiom, category=category, problem=problem)
 
+    cached = cache.get(MODEL, prompt)
+    if cached is not None:
+        return json.loads(cached)
+
     for attempt in range(max_retries):
         try:
-            response = client.models.generate_content(
-                model="gemini-3-flash-preview",
+            response = gemini.models.generate_content(
+                model=MODEL,
                 contents=prompt
             )
             text = response.text.strip()
@@ -57,6 +61,7 @@ def convert_axiom(axiom, category, problem, max_retries=3):
             assert "core_rule" in result, "Missing core_rule"
             assert "mental_model" in result, "Missing mental_model"
             assert "anchor_question" in result, "Missing anchor_question"
+            cache.put(MODEL, prompt, text)
             return result
 
         except Exception as e:
@@ -137,6 +142,8 @@ def migrate():
     print(f"  Skipped (already JSON): {skipped}")
     print(f"  Failed: {failed}")
     print(f"  Total: {len(rows)}")
+    print(f"  {cache.summary()}")
+    print(clients.summary())
 
 
 if __name__ == "__main__":
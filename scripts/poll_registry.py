@@ -0,0 +1,69 @@
+"""Python side of the flaw_poll_registry table (outstanding Spot the Flaw polls).
+
+The sprint-webhook edge function is the only writer: it inserts one row per
+quiz poll it sends and resolves each poll_answer with a primary-key lookup on
+poll_id. lookup() applies the same rule, so scripts see exactly the polls the
+webhook would still accept. Rows live FLAW_POLL_TTL_HOURS (set in the edge
+function); a poll counts as open while expires_at is in the future. The
+webhook purges expired rows each time it registers a poll, and `purge` does
+the same on demand.
+
+Usage:
+    python scripts/poll_registry.py show [POLL_ID]   # one poll, or every outstanding poll
+    python scripts/poll_registry.py purge            # delete expired rows
+"""
+import argparse
+from datetime import datetime, timezone
+
+from clients import supabase
+
+TABLE = "flaw_poll_registry"
+COLUMNS = "poll_id, session_id, problem_id, log_id, question_index, expires_at"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def lookup(poll_id):
+    """The registry row for poll_id, or None if it is unknown or expired (same query as the webhook)."""
+    rows = supabase.table(TABLE).select(COLUMNS)\
+        .eq("poll_id", str(poll_id))\
+        .gt("expires_at", _now().isoformat())\
+        .limit(1)\
+        .execute().data
+    return rows[0] if rows else None
+
+
+def purge_expired():
+    """Delete every row past its expires_at. Returns the number removed."""
+    result = supabase.table(TABLE).delete().lt("expires_at", _now().isoformat()).execute()
+    return len(result.data or [])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inspect or purge the Spot the Flaw poll registry.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show")
+    show.add_argument("poll_id", nargs="?")
+    sub.add_parser("purge")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "show" and args.poll_id:
+        row = lookup(args.poll_id)
+        if row:
+            print(f"Poll {row['poll_id']}: session {row['session_id']}, question {row['question_index'] + 1}, "
+                  f"problem {row['problem_id']}, expires {row['expires_at']}")
+        else:
+            print(f"Poll {args.poll_id} is not registered (or has expired).")
+    elif args.command == "show":
+        rows = supabase.table(TABLE).select(COLUMNS).order("created_at").execute().data or []
+        for row in rows:
+            print(f"  {row['poll_id']}  session {row['session_id']}  Q{row['question_index'] + 1}  "
+                  f"problem {row['problem_id']}  expires {row['expires_at']}")
+        print(f"{len(rows)} poll(s) registered.")
+    elif args.command == "purge":
+        print(f"🧹 {purge_expired()} expired poll(s) removed.")
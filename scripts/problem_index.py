@@ -0,0 +1,199 @@
+"""Near-duplicate index of problems already in qa_flaw_deck (or queued for review).
+
+Overlapping transcripts (`Class12 jan18 p2.txt` vs `part2.txt`, Class13_P1/P2
+vs Class18_p1_p2) yield the same teacher problem in slightly different words.
+Each original_problem is reduced to a MinHash signature over its content
+words (word order and filler words vary most between extractions) and
+bucketed with LSH, so a new problem is compared only against the
+few stored problems that share a bucket. Two problems match when their
+estimated Jaccard similarity reaches the threshold and they use the same
+numbers (a changed number is a different problem).
+
+Signatures live in .cache/problem_index.json; sync() only hashes deck rows it
+has not seen before.
+
+Usage:
+    python scripts/problem_index.py sync                   # pull new deck rows into the index
+    python scripts/problem_index.py check "problem text"   # nearest stored problem
+    python scripts/problem_index.py dupes [--threshold 0.5]  # near-duplicate pairs already in the deck
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+
+from deck_writer import content_hash
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(PROJECT_DIR, ".cache", "problem_index.json")
+
+DEFAULT_THRESHOLD = 0.5
+STOPWORDS = set("a an and are as at be by find for from how if in is it its many much of on or "
+                "that the then this to was were what which with".split())
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs around 0.5 similarity collide in some band
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20261016)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def problem_numbers(text):
+    return sorted(re.findall(r"\d+(?:\.\d+)?", text))
+
+
+def shingles(text):
+    words = re.findall(r"[^\W_]+", text.lower())
+    return {w for w in words if w not in STOPWORDS} or set(words) or {""}
+
+
+def signature(text):
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+              for s in shingles(text)]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _bands(sig):
+    return [f"{band}:{hash(tuple(sig[band * ROWS:(band + 1) * ROWS]))}" for band in range(BANDS)]
+
+
+class ProblemIndex:
+    def __init__(self, path=DEFAULT_PATH, threshold=DEFAULT_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.entries = {}
+        self.buckets = {}
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for key, entry in json.load(f).get("entries", {}).items():
+                    self._insert(key, entry)
+
+    def _insert(self, key, entry):
+        self.entries[key] = entry
+        for band in _bands(entry["signature"]):
+            self.buckets.setdefault(band, set()).add(key)
+
+    def add(self, record):
+        """Index a record (anything with source_file + original_problem)."""
+        key = content_hash(record)
+        with self.lock:
+            if key in self.entries:
+                return
+            text = record["original_problem"]
+            self._insert(key, {
+                "source_file": record["source_file"],
+                "problem": text[:120],
+                "numbers": problem_numbers(text),
+                "signature": signature(text),
+            })
+
+    def find(self, text, threshold=None, source_file=None):
+        """Best stored match as (similarity, entry), or None below the threshold.
+
+        With source_file, entries from that same transcript are ignored: a rerun
+        of a transcript would otherwise match its own earlier extraction, and
+        exact repeats are already absorbed by the content_hash upsert.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        sig, numbers = signature(text), problem_numbers(text)
+        own_key = content_hash({"source_file": source_file, "original_problem": text}) if source_file else None
+        with self.lock:
+            candidates = set()
+            for band in _bands(sig):
+                candidates |= self.buckets.get(band, set())
+            best = None
+            for key in candidates:
+                entry = self.entries[key]
+                if entry["numbers"] != numbers:
+                    continue
+                if source_file and (key == own_key or entry["source_file"] == source_file):
+                    continue
+                score = similarity(sig, entry["signature"])
+                if score >= threshold and (best is None or score > best[0]):
+                    best = (score, entry)
+        return best
+
+    def duplicate_pairs(self, threshold=None):
+        threshold = self.threshold if threshold is None else threshold
+        pairs = set()
+        for keys in self.buckets.values():
+            for a in keys:
+                for b in keys:
+                    if a < b:
+                        pairs.add((a, b))
+        found = []
+        for a, b in pairs:
+            ea, eb = self.entries[a], self.entries[b]
+            score = similarity(ea["signature"], eb["signature"])
+            if ea["numbers"] == eb["numbers"] and score >= threshold:
+                found.append((score, ea, eb))
+        return sorted(found, key=lambda p: -p[0])
+
+    def sync(self, supabase, page_size=1000):
+        """Add every qa_flaw_deck row not yet indexed. Returns the number added."""
+        before = len(self.entries)
+        start = 0
+        while True:
+            rows = supabase.table("qa_flaw_deck").select("source_file, original_problem")\
+                .range(start, start + page_size - 1).execute().data or []
+            for row in rows:
+                if row.get("source_file") and row.get("original_problem"):
+                    self.add(row)
+            if len(rows) < page_size:
+                break
+            start += page_size
+        self.save()
+        return len(self.entries) - before
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with self.lock:
+            data = {"num_perm": NUM_PERM, "bands": BANDS, "entries": self.entries}
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Near-duplicate index over qa_flaw_deck problems.")
+    parser.add_argument("--index", default=DEFAULT_PATH, help="Index file (default: .cache/problem_index.json)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Estimated Jaccard similarity that counts as a duplicate (default: {DEFAULT_THRESHOLD})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("sync")
+    check = sub.add_parser("check")
+    check.add_argument("text")
+    sub.add_parser("dupes")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    index = ProblemIndex(args.index, args.threshold)
+    if args.command == "sync":
+        from clients import supabase
+
+        added = index.sync(supabase)
+        print(f"✅ {added} new problem(s) indexed, {len(index.entries)} total.")
+    elif args.command == "check":
+        match = index.find(args.text)
+        if match:
+            score, entry = match
+            print(f"Duplicate ({score:.0%}) of {entry['source_file']}: {entry['problem'][:80]}...")
+        else:
+            print("No near-duplicate in the index.")
+    elif args.command == "dupes":
+        pairs = index.duplicate_pairs()
+        for score, a, b in pairs:
+            print(f"  {score:.0%}  {a['source_file']}: {a['problem'][:50]}...")
+            print(f"        {b['source_file']}: {b['problem'][:50]}...")
+        print(f"\n{len(pairs)} near-duplicate pair(s) among {len(index.entries)} indexed problems.")
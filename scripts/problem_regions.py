@@ -0,0 +1,178 @@
+"""Local (non-LLM) detector for problem-solving regions in a class transcript.
+
+Most of a class is explanation; Call 1 only needs the stretches where a
+problem is stated and worked through. The transcript is cut into blocks of
+~40 words (Whisper output often has no punctuation to split sentences on),
+each block is scored for problem-solving signals — numbers, "answer is",
+option letters, question and step cues, in English and Devanagari Hinglish —
+and the score is smoothed over neighbouring blocks. Blocks above the
+threshold, plus a block of context either side, become candidate spans.
+
+Tune the threshold against a labeled sample: a JSON file listing, per
+transcript, verbatim snippets of problems the teacher fully solved.
+transcripts/region_labels.json is a small committed one; extend it as more
+classes are labeled.
+
+    [{"transcript": "transcripts/Qa class14Jan22.txt",
+      "problems": ["Population of a change Because of 200K In 2020 ...", "..."]}]
+
+Usage:
+    python scripts/problem_regions.py transcripts/qa_dec20.txt [--threshold 2.0]
+    python scripts/problem_regions.py --labels transcripts/region_labels.json [--threshold 2.0]
+"""
+import argparse
+import json
+import os
+import re
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BLOCK_WORDS = 40
+DEFAULT_THRESHOLD = 2.0
+SPAN_SEPARATOR = "\n[...]\n"
+MIN_KEPT_FRACTION = 0.05  # keeping less than this usually means the detector missed, not a problem-free class
+
+NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*%?")
+OPERATOR_RE = re.compile(r"[=+×÷*/^√]|\bx\b")
+# Cues are whole words or phrases, matched case-insensitively between
+# whitespace/punctuation (\b is unreliable for Devanagari). A trailing "*" makes
+# the cue a stem: "multipl*" matches "multiply" and "multiplied".
+SIGNALS = {
+    # weight: cues
+    3.0: ["answer is", "answer will be", "answer comes", "आंसर इज", "आंसर आएगा", "आंसर होगा", "उत्तर"],
+    2.0: ["option a", "option b", "option c", "option d", "ऑप्शन", "question*", "क्वेश्चन", "find the",
+          "what is the value", "how many", "फाइंड", "सॉल्व", "solv*"],
+    1.0: ["first", "then", "therefore", "substitut*", "multipl*", "divid*", "equals", "equal to", "cancel*",
+          "remainder", "ratio", "ratios", "फर्स्ट", "देन", "इक्वल", "मल्टीप्लाई", "डिवाइड", "सब्स्टीट्यूट", "कैंसिल",
+          "रिमेंडर", "रेशियो", "इनटू", "बाय"],
+}
+_EDGE_L = r"(?:(?<=^)|(?<=[\s,.?!।;:()\"'-]))"
+_EDGE_R = r"(?=[\s,.?!।;:()\"'-]|$)"
+
+
+def _cue_re(cue):
+    if cue.endswith("*"):
+        return re.compile(_EDGE_L + re.escape(cue[:-1]))
+    return re.compile(_EDGE_L + re.escape(cue) + _EDGE_R)
+
+
+SIGNAL_RES = {weight: [_cue_re(cue) for cue in cues] for weight, cues in SIGNALS.items()}
+
+
+def split_blocks(transcript, block_words=BLOCK_WORDS):
+    """(start_char, end_char) for consecutive blocks of ~block_words words."""
+    words = list(re.finditer(r"\S+", transcript))
+    blocks = []
+    for i in range(0, len(words), block_words):
+        chunk = words[i:i + block_words]
+        blocks.append((chunk[0].start(), chunk[-1].end()))
+    return blocks
+
+
+def score_block(text):
+    lowered = text.lower()
+    words = max(1, len(lowered.split()))
+    score = 10.0 * len(NUMBER_RE.findall(text)) / words
+    score += 0.5 * len(OPERATOR_RE.findall(lowered))
+    for weight, patterns in SIGNAL_RES.items():
+        score += weight * sum(len(p.findall(lowered)) for p in patterns)
+    return score
+
+
+def detect_spans(transcript, threshold=DEFAULT_THRESHOLD, context_blocks=1, block_words=BLOCK_WORDS):
+    """Candidate (start_char, end_char) spans likely to contain a solved problem."""
+    blocks = split_blocks(transcript, block_words)
+    if not blocks:
+        return []
+    raw = [score_block(transcript[s:e]) for s, e in blocks]
+    smoothed = [
+        sum(raw[max(0, i - 1):i + 2]) / len(raw[max(0, i - 1):i + 2])
+        for i in range(len(raw))
+    ]
+
+    keep = [False] * len(blocks)
+    for i, score in enumerate(smoothed):
+        if score >= threshold:
+            for j in range(max(0, i - context_blocks), min(len(blocks), i + context_blocks + 1)):
+                keep[j] = True
+
+    spans = []
+    for i, kept in enumerate(keep):
+        if not kept:
+            continue
+        start, end = blocks[i]
+        if spans and i > 0 and keep[i - 1]:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def candidate_text(transcript, spans):
+    return SPAN_SEPARATOR.join(transcript[s:e] for s, e in spans)
+
+
+def kept_fraction(transcript, spans):
+    return sum(e - s for s, e in spans) / len(transcript) if transcript else 0.0
+
+
+def _normalise(text):
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def evaluate(labels, threshold=DEFAULT_THRESHOLD, min_overlap=0.8):
+    """Recall of labeled problem snippets and share of text kept, per transcript and overall."""
+    total_found = total_labeled = 0
+    total_kept = total_chars = 0
+    for entry in labels:
+        path = os.path.join(PROJECT_DIR, entry["transcript"])
+        with open(path, "r") as f:
+            transcript = _normalise(f.read())
+        spans = detect_spans(transcript, threshold)
+        found = 0
+        for snippet in entry["problems"]:
+            snippet = _normalise(snippet)
+            start = transcript.find(snippet)
+            if start == -1:
+                print(f"  ⚠️ Label not found verbatim in {entry['transcript']}: {snippet[:50]}...")
+                continue
+            end = start + len(snippet)
+            covered = sum(max(0, min(e, end) - max(s, start)) for s, e in spans)
+            total_labeled += 1
+            if covered / len(snippet) >= min_overlap:
+                found += 1
+        total_found += found
+        kept = sum(e - s for s, e in spans)
+        total_kept += kept
+        total_chars += len(transcript)
+        print(f"  {entry['transcript']}: {found}/{len(entry['problems'])} problems covered, "
+              f"{kept / len(transcript):.0%} of text kept")
+    recall = total_found / total_labeled if total_labeled else 0.0
+    kept = total_kept / total_chars if total_chars else 0.0
+    print(f"\nThreshold {threshold}: recall {recall:.0%} ({total_found}/{total_labeled}), {kept:.0%} of text kept")
+    return recall, kept
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Find problem-solving regions in a transcript without an LLM.")
+    parser.add_argument("transcript", nargs="?", help="Transcript to scan")
+    parser.add_argument("--labels", help="Labeled sample JSON to measure recall against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Smoothed block score needed to keep a region (default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args()
+    if not args.transcript and not args.labels:
+        parser.error("give a transcript, --labels, or both")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.transcript:
+        with open(args.transcript, "r") as f:
+            text = f.read()
+        spans = detect_spans(text, args.threshold)
+        print(f"{len(spans)} candidate span(s), {kept_fraction(text, spans):.0%} of "
+              f"{len(text):,} chars kept at threshold {args.threshold}.")
+    if args.labels:
+        with open(args.labels, "r") as f:
+            evaluate(json.load(f), args.threshold)
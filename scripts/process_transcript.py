@@ -1,15 +1,29 @@
 import os
 import json
-import sys
-import time
-from google import genai
-from supabase import create_client
+import argparse
+import queue
+import re
+import threading
+from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+import clients
+from clients import gemini, supabase
+from deck_writer import CHUNK_SIZE, DeckWriter
+from llm_cache import cache
+from problem_index import DEFAULT_THRESHOLD as DUP_THRESHOLD, ProblemIndex
+from problem_regions import DEFAULT_THRESHOLD, MIN_KEPT_FRACTION, candidate_text, detect_spans, kept_fraction
+from rate_limiter import TokenBucket, retry_after
+from recovery_journal import RecoveryJournal
+from review_queue import enqueue, load_queue, print_record
+
 load_dotenv()
 
-client = genai.Client(api_key=os.environ["GEMINI_API_KEY"].strip())
-supabase = create_client(os.environ["SUPABASE_URL"].strip(), os.environ["SUPABASE_KEY"].strip())
+MODEL = "gemini-2.5-flash"
+
+# Shared by every worker thread so concurrent calls stay inside the Gemini quota
+limiter = TokenBucket(rate_per_minute=10)
 
 ERROR_CATEGORIES = [
     "Algebraic Sign Error",
@@ -44,15 +58,26 @@ Transcript:
 {transcript}
 """
 
+CALL_1_WINDOW_NOTE = """[This is part {part} of {total} of a longer transcript. It may begin or end in the middle of a problem.
+Skip any problem whose statement or solution is cut off at the start or end of this part — it is fully covered by a neighbouring part.]
+
+"""
+
 CALL_2_PROMPT = """
-Below is a math problem and solution steps extracted from a class transcript.
+Below is a JSON array of math problems and solution steps extracted from a class transcript.
 Clean up the language so each step is one precise mathematical action.
 Do not change any numbers, logic, or mathematical operations. Only improve clarity.
-Return the exact same JSON structure with cleaner language.
+Return a JSON array with exactly the same number of problems, in the same order and the same structure,
+with cleaner language. No text outside the JSON.
 
 {extracted}
 """
 
+# Call 2 input per request, estimated at ~4 characters per token. A few problems
+# share a call; a failed batch is retried one problem at a time.
+SANITIZE_BATCH_TOKENS = 2000
+SANITIZE_RETRIES = 2
+
 CALL_3_PROMPT = """
 Below is a correct step-by-step solution to a math problem.
 Your task: Introduce exactly one conceptual error into exactly one step.
@@ -82,124 +107,725 @@ Problem: {problem}
 Correct steps: {steps}
 """
 
+# ─────────────────────────────────────────────
+# Transcript compaction (before Call 1)
+# ─────────────────────────────────────────────
+
+# Tag questions and interjections that carry no problem content. Only matched as
+# whole words between whitespace/punctuation, since \b is unreliable for Devanagari.
+# A tag question is only filler as a whole utterance ("... = 5. Right? Now") or
+# after a comma closing a clause ("x = 5, okay?"); bare adjectives such as
+# "correct" or "fine" are left out, since "Which statement is correct?" is content.
+_EDGE_L = r"(?:(?<=^)|(?<=[\s,.?!।]))"
+_EDGE_R = r"(?=[\s,.?!।]|$)"
+FILLER_TAGS = ["is that clear", "इज दैट क्लियर", "इज़ दैट क्लियर",
+               "right", "okay", "ok", "understood", "got it",
+               "राइट", "ओके", "ओक", "ठीक है", "समझ आया", "सही है ना", "है ना"]
+INTERJECTIONS = ["um+", "uh+", "hmm+", "erm", "हम्म+", "अम्म+"]
+SENTENCE_OPENERS = ["okay", "ok", "right", "alright", "so", "now", "ओके", "राइट", "सो", "तो", "अच्छा", "नाउ"]
+
+TAG_RE = re.compile(r"(?:(?<=^)|(?<=[.?!।]\s)|(?P<comma>,\s*))(?:" + "|".join(re.escape(t) for t in FILLER_TAGS)
+                    + r")\s*\?+" + _EDGE_R, re.IGNORECASE)
+INTERJECTION_RE = re.compile(_EDGE_L + r"(?:" + "|".join(INTERJECTIONS) + r")[,.।]?" + _EDGE_R, re.IGNORECASE)
+OPENER_RE = re.compile(r"(?:(?<=^)|(?<=[.?!।]\s))(?:(?:" + "|".join(re.escape(o) for o in SENTENCE_OPENERS) + r")[,.।!]?\s+)+", re.IGNORECASE)
+MAX_REPEAT_WORDS = 6
+MATH_WORDS = {"root", "square", "cube", "minus", "plus", "into", "by", "रूट", "स्क्वायर", "क्यूब",
+              "माइनस", "प्लस", "इनटू", "बाय"}
+SENTENCE_END_RE = re.compile(r"[.?!।]$")
+TRAILING_PUNCT_RE = re.compile(r"[,.?!।;:]*$")
+
+def _norm_token(token):
+    return TRAILING_PUNCT_RE.sub("", token.lower())
+
+def _is_working(words):
+    """Repeats that may be real working: any number, or only variables/operators ("P P P P", "root root")."""
+    if any(ch.isdigit() for word in words for ch in word):
+        return True
+    return all(len(word) <= 2 or word in MATH_WORDS for word in words)
+
+def collapse_repeats(text):
+    """Drop immediate repetitions of 1–6 word phrases ("नाउ नाउ", "rational numbers, rational numbers").
+
+    Phrases containing digits are never collapsed: "10 10" may be real working.
+    """
+    tokens = text.split()
+    out, out_norm = [], []
+    for token in tokens:
+        out.append(token)
+        out_norm.append(_norm_token(token))
+        for n in range(min(MAX_REPEAT_WORDS, len(out) // 2), 0, -1):
+            tail, prev = out_norm[-n:], out_norm[-2 * n:-n]
+            if tail != prev or not all(tail) or _is_working(tail):
+                continue
+            first_end, second_end = out[-n - 1], out[-1]
+            if SENTENCE_END_RE.search(first_end) and not SENTENCE_END_RE.search(second_end):
+                continue  # "ask. Ask yourself" spans a sentence break, not a stutter
+            # Keep the first copy, with the trailing punctuation of the second
+            out[-n - 1] = TRAILING_PUNCT_RE.sub("", first_end) + TRAILING_PUNCT_RE.search(second_end).group(0)
+            del out[-n:]
+            del out_norm[-n:]
+            break
+    return " ".join(out)
+
+def compact_transcript(text):
+    text = re.sub(r"\s+", " ", text).strip()
+    text = TAG_RE.sub(lambda m: "." if m.group("comma") else "", text)
+    text = INTERJECTION_RE.sub("", text)
+    text = OPENER_RE.sub("", text)
+    text = collapse_repeats(text)
+    text = re.sub(r"\s+([,.?!।])", r"\1", text)
+    text = re.sub(r"([,.?!।])(?:\s*[,.।])+", r"\1", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+DEVANAGARI_RE = re.compile(r"[\u0900-\u097F]")
+CHARS_PER_TOKEN = 4             # Latin script, digits, punctuation, spaces
+DEVANAGARI_CHARS_PER_TOKEN = 2  # Hindi splits into far more tokens per character
+
+def estimate_tokens(text):
+    """Rough input-token count, computed locally so reporting costs no API calls.
+
+    Script-aware: the transcripts are largely Devanagari, which a flat
+    4 chars/token would undercount by about half.
+    """
+    devanagari = len(DEVANAGARI_RE.findall(text))
+    return devanagari // DEVANAGARI_CHARS_PER_TOKEN + (len(text) - devanagari) // CHARS_PER_TOKEN
+
+def strip_fence(text):
+    """Reply text without a surrounding markdown code block (```json ... ```), if any."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return text
+
 def call_llm(prompt, max_retries=5):
-    import time
+    cached = cache.get(MODEL, prompt)
+    if cached is not None:
+        return cached
     for attempt in range(max_retries):
+        limiter.acquire()
         try:
-            response = client.models.generate_content(model="gemini-2.5-flash", contents=prompt)
-            text = response.text.strip()
-            # Strip markdown code blocks if present
-            if text.startswith("```"):
-                text = text.split("\n", 1)[1]
-                text = text.rsplit("```", 1)[0]
+            response = gemini.models.generate_content(model=MODEL, contents=prompt)
+            text = strip_fence(response.text)
+            cache.put(MODEL, prompt, text)
             return text
         except Exception as e:
             if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                wait = 2 ** attempt * 10  # 10s, 20s, 40s, 80s, 160s
-                print(f"  ⏳ Rate limited. Waiting {wait}s before retry {attempt+1}/{max_retries}...")
-                time.sleep(wait)
+                wait = limiter.cool_down(retry_after(e))
+                print(f"  ⏳ Rate limited. Pausing all calls for {wait:.0f}s before retry {attempt+1}/{max_retries}...")
             else:
                 raise
     raise Exception("Max retries exceeded for Gemini API")
 
-def process_transcript(filepath):
+def call_llm_json(prompt):
+    """call_llm + json.loads. A reply that does not parse is evicted so a rerun asks again."""
+    text = call_llm(prompt)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        cache.discard(MODEL, prompt)
+        raise
+
+def call_llm_stream(prompt, max_retries=5):
+    """Like call_llm, but yields the reply text as Gemini streams it.
+
+    A cached reply is yielded in one piece. Rate-limit errors are retried only
+    before the first chunk arrives; the full reply is cached once it completes.
+    """
+    cached = cache.get(MODEL, prompt)
+    if cached is not None:
+        yield cached
+        return
+    for attempt in range(max_retries):
+        limiter.acquire()
+        parts = []
+        try:
+            for chunk in gemini.models.generate_content_stream(model=MODEL, contents=prompt):
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+        except Exception as e:
+            if not parts and ("429" in str(e) or "RESOURCE_EXHAUSTED" in str(e)):
+                wait = limiter.cool_down(retry_after(e))
+                print(f"  ⏳ Rate limited. Pausing all calls for {wait:.0f}s before retry {attempt+1}/{max_retries}...")
+                continue
+            raise
+        cache.put(MODEL, prompt, strip_fence("".join(parts)))
+        return
+    raise Exception("Max retries exceeded for Gemini API")
+
+class JsonArrayStream:
+    """Incremental parser for a streamed JSON array of objects.
+
+    feed() returns every top-level object that closed in the new text. Text
+    before the opening bracket (e.g. a ```json fence) and after the closing
+    one is ignored; `done` is set once the array itself has closed.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.start = None
+        self.in_string = False
+        self.escape = False
+        self.done = False
+        self.malformed = 0
+
+    def feed(self, text):
+        self.buffer += text
+        items = []
+        while self.pos < len(self.buffer) and not self.done:
+            c = self.buffer[self.pos]
+            if self.depth == 0:
+                if c == "[":
+                    self.depth = 1
+            elif self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+            elif c == '"':
+                self.in_string = True
+            elif c in "{[":
+                if self.depth == 1 and c == "{":
+                    self.start = self.pos
+                self.depth += 1
+            elif c in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.done = True
+                elif self.depth == 1 and self.start is not None:
+                    try:
+                        items.append(json.loads(self.buffer[self.start:self.pos + 1]))
+                    except json.JSONDecodeError:
+                        self.malformed += 1
+                    self.start = None
+            self.pos += 1
+        # Drop text that can no longer be part of an object
+        keep_from = self.start if self.start is not None else self.pos
+        self.buffer = self.buffer[keep_from:]
+        self.pos -= keep_from
+        if self.start is not None:
+            self.start = 0
+        return items
+
+def split_windows(transcript, window_chars, overlap_chars):
+    """Split a transcript into overlapping windows, cutting at sentence or word boundaries."""
+    if window_chars <= 0 or len(transcript) <= window_chars:
+        return [transcript]
+
+    windows = []
+    start = 0
+    while True:
+        end = min(start + window_chars, len(transcript))
+        if end < len(transcript):
+            floor = start + window_chars // 2
+            cut = transcript.rfind(". ", floor, end)
+            if cut == -1:
+                cut = transcript.rfind(" ", floor, end)
+            if cut != -1:
+                end = cut + 1
+        windows.append(transcript[start:end])
+        if end >= len(transcript):
+            return windows
+        start = end - overlap_chars
+        space = transcript.find(" ", start, end)
+        if space != -1:
+            start = space + 1
+
+def _statement_key(statement):
+    return " ".join(re.findall(r"[a-z0-9]+", statement.lower()))
+
+def _numbers(statement):
+    return sorted(re.findall(r"\d+(?:\.\d+)?", statement))
+
+def is_same_problem(a, b, threshold=0.8):
+    """Two extractions of one problem: same numbers, near-identical wording."""
+    if _numbers(a["problem_statement"]) != _numbers(b["problem_statement"]):
+        return False
+    ratio = SequenceMatcher(None, _statement_key(a["problem_statement"]),
+                            _statement_key(b["problem_statement"])).ratio()
+    return ratio >= threshold
+
+def merge_extracted(batches):
+    """Merge per-window extractions in transcript order, dropping boundary duplicates.
+
+    When a problem shows up in two overlapping windows, the version with more
+    solution steps wins (the other one was usually cut short by the boundary).
+    """
+    merged = []
+    for batch in batches:
+        for item in batch:
+            for j, kept in enumerate(merged):
+                if is_same_problem(kept, item):
+                    if len(item["solution_steps"]) > len(kept["solution_steps"]):
+                        merged[j] = item
+                    break
+            else:
+                merged.append(item)
+    return merged
+
+def extract_problems(executor, transcript, window_chars=0, overlap_chars=6000):
+    """Call 1. Long transcripts are split into overlapping windows extracted in parallel."""
+    windows = split_windows(transcript, window_chars, overlap_chars)
+    if len(windows) == 1:
+        return call_llm_json(CALL_1_PROMPT.format(transcript=transcript))
+
+    print(f"Split into {len(windows)} windows of ~{window_chars} chars ({overlap_chars} overlap).")
+    futures = [
+        executor.submit(call_llm_json, CALL_1_PROMPT.format(
+            transcript=CALL_1_WINDOW_NOTE.format(part=i + 1, total=len(windows)) + window
+        ))
+        for i, window in enumerate(windows)
+    ]
+    batches = [future.result() for future in futures]
+    extracted = merge_extracted(batches)
+    dropped = sum(len(b) for b in batches) - len(extracted)
+    if dropped:
+        print(f"Merged {dropped} duplicate(s) straddling window boundaries.")
+    return extracted
+
+def compact_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+def sanitize_batches(extracted, batch_tokens=SANITIZE_BATCH_TOKENS):
+    """Group problems into micro-batches of at most ~batch_tokens input tokens (0 = one per call)."""
+    batches, current, size = [], [], 0
+    for item in extracted:
+        tokens = estimate_tokens(compact_json(item))
+        if current and (batch_tokens <= 0 or size + tokens > batch_tokens):
+            batches.append(current)
+            current, size = [], 0
+        current.append(item)
+        size += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def sanitize_batch(items):
+    """One Call 2 request. Raises ValueError if the reply does not line up with the input."""
+    prompt = CALL_2_PROMPT.format(extracted=compact_json(items))
+    result = call_llm_json(prompt)
+    if not (isinstance(result, list) and len(result) == len(items) and all(
+            isinstance(r, dict) and r.get("problem_statement") and isinstance(r.get("solution_steps"), list)
+            for r in result)):
+        cache.discard(MODEL, prompt)
+        raise ValueError(f"expected {len(items)} sanitized problem(s), got {str(result)[:60]}")
+    return result
+
+def sanitize_item(item):
+    """Retry a single problem on its own. Falls back to the unsanitized extraction."""
+    for attempt in range(SANITIZE_RETRIES):
+        try:
+            return sanitize_batch([item])[0]
+        except Exception as e:
+            print(f"  ⚠️ Sanitizing \"{item['problem_statement'][:40]}...\" failed "
+                  f"(attempt {attempt+1}/{SANITIZE_RETRIES}): {str(e)[:80]}")
+    print(f"  ↩️ Keeping the extracted wording for \"{item['problem_statement'][:40]}...\"")
+    return item
+
+def sanitize_or_split(items):
+    try:
+        return sanitize_batch(items)
+    except Exception as e:
+        if len(items) == 1:
+            print(f"  ⚠️ Sanitizing failed: {str(e)[:80]}")
+            return [sanitize_item(items[0])]
+        print(f"  ⚠️ Batch of {len(items)} failed ({str(e)[:60]}). Retrying each problem alone...")
+        return [sanitize_item(item) for item in items]
+
+def sanitize_all(executor, extracted, batch_tokens=SANITIZE_BATCH_TOKENS):
+    """Call 2, fanned out in micro-batches. A bad reply only costs its own batch."""
+    batches = sanitize_batches(extracted, batch_tokens)
+    print(f"Sanitizing {len(extracted)} problems in {len(batches)} call(s).")
+    futures = [executor.submit(sanitize_or_split, items) for items in batches]
+    return [item for future in futures for item in future.result()]
+
+# ─────────────────────────────────────────────
+# Call 3 validation and local repair
+# ─────────────────────────────────────────────
+
+MAX_STEPS = 10  # Telegram polls allow at most 10 options
+AXIOM_KEYS = ("core_rule", "mental_model", "anchor_question")
+CORRUPT_RETRIES = 2
+
+def _step_key(step):
+    return " ".join(str(step).lower().split())
+
+def merge_short_steps(steps, flaw_step, max_steps=MAX_STEPS):
+    """Merge adjacent correct steps, shortest pair first, until at most max_steps remain.
+
+    The flawed step is never merged. Returns (steps, flaw_step), or None if the
+    limit cannot be reached without touching the flaw.
+    """
+    steps = list(steps)
+    flaw = flaw_step - 1
+    while len(steps) > max_steps:
+        pairs = [i for i in range(len(steps) - 1) if flaw not in (i, i + 1)]
+        if not pairs:
+            return None
+        i = min(pairs, key=lambda i: len(steps[i]) + len(steps[i + 1]))
+        steps[i:i + 2] = [f"{steps[i].rstrip().rstrip('.')}; {steps[i + 1].strip()}"]
+        if i < flaw:
+            flaw -= 1
+    return steps, flaw + 1
+
+def repair_corruption(corruption):
+    """Fix what can be fixed without an LLM: types, category spelling, step count."""
+    if not isinstance(corruption, dict):
+        return corruption
+    repaired = dict(corruption)
+    flaw = repaired.get("flaw_step_number")
+    if isinstance(flaw, str) and flaw.strip().isdigit():
+        repaired["flaw_step_number"] = int(flaw.strip())
+    axiom = repaired.get("trap_axiom")
+    if isinstance(axiom, str):
+        try:
+            repaired["trap_axiom"] = json.loads(axiom)
+        except json.JSONDecodeError:
+            pass
+    category = str(repaired.get("error_category", "")).strip().lower()
+    for known in ERROR_CATEGORIES:
+        if category == known.lower():
+            repaired["error_category"] = known
+    steps = repaired.get("corrupted_steps")
+    flaw = repaired.get("flaw_step_number")
+    if (isinstance(steps, list) and len(steps) > MAX_STEPS and isinstance(flaw, int)
+            and 1 <= flaw <= len(steps) and all(isinstance(step, str) for step in steps)):
+        merged = merge_short_steps(steps, flaw)
+        if merged:
+            print(f"  🔧 Merged {len(steps)} steps down to {len(merged[0])} locally.")
+            repaired["corrupted_steps"], repaired["flaw_step_number"] = merged
+    return repaired
+
+def validate_corruption(item, corruption):
+    """Problems with a Call 3 result that would make it unusable. Empty list means valid."""
+    if not isinstance(corruption, dict):
+        return ["reply is not a JSON object"]
+    issues = []
+    steps = corruption.get("corrupted_steps")
+    flaw = corruption.get("flaw_step_number")
+    if not (isinstance(steps, list) and steps and all(isinstance(s, str) and s.strip() for s in steps)):
+        return ["corrupted_steps is not a list of steps"]
+    if len(steps) > MAX_STEPS:
+        issues.append(f"{len(steps)} steps (max {MAX_STEPS})")
+    if not isinstance(flaw, int) or not 1 <= flaw <= len(steps):
+        issues.append(f"flaw_step_number {flaw!r} out of range")
+    else:
+        original = item["solution_steps"]
+        if len(original) == len(steps):
+            unchanged = _step_key(steps[flaw - 1]) == _step_key(original[flaw - 1])
+        else:
+            unchanged = _step_key(steps[flaw - 1]) in {_step_key(s) for s in original}
+        if unchanged:
+            issues.append(f"step {flaw} is identical to the correct solution")
+    if corruption.get("error_category") not in ERROR_CATEGORIES:
+        issues.append(f"unknown error_category {corruption.get('error_category')!r}")
+    axiom = corruption.get("trap_axiom")
+    if not (isinstance(axiom, dict) and all(isinstance(axiom.get(k), str) and axiom[k].strip() for k in AXIOM_KEYS)):
+        issues.append("trap_axiom is missing core_rule/mental_model/anchor_question")
+    if not str(corruption.get("explanation", "")).strip():
+        issues.append("explanation is empty")
+    return issues
+
+def corrupt_prompt(item):
+    return CALL_3_PROMPT.format(
+        categories=json.dumps(ERROR_CATEGORIES),
+        problem=item['problem_statement'],
+        steps=json.dumps(item['solution_steps'])
+    )
+
+def corrupt_problem(item):
+    """Call 3 with local repair. Only results that are still broken are sent back to Gemini."""
+    prompt = corrupt_prompt(item)
+    for attempt in range(CORRUPT_RETRIES + 1):
+        corruption = repair_corruption(call_llm_json(prompt))
+        issues = validate_corruption(item, corruption)
+        if not issues:
+            return corruption
+        cache.discard(MODEL, prompt)
+        if attempt < CORRUPT_RETRIES:
+            print(f"  🔁 Invalid corruption ({'; '.join(issues)}). Asking again ({attempt+1}/{CORRUPT_RETRIES})...")
+    raise ValueError("; ".join(issues))
+
+class DuplicateProblem(Exception):
+    pass
+
+def corrupt_pair(item, index=None, source_file=None):
+    """Call 3 for one problem, unless the index already holds a near-duplicate of it from another transcript."""
+    match = index.find(item["problem_statement"], source_file=source_file) if index else None
+    if match:
+        score, entry = match
+        raise DuplicateProblem(f"{score:.0%} match with {entry['source_file']}: {entry['problem'][:50]}...")
+    return item, corrupt_problem(item)
+
+def sanitize_and_corrupt(item, index=None, source_file=None):
+    """Call 2 then Call 3 for one streamed problem."""
+    return corrupt_pair(sanitize_or_split([item])[0], index, source_file)
+
+def corrupt_all(executor, sanitized, index=None, source_file=None):
+    """Submit Call 3 for every problem. Futures of (item, corruption) come back in problem order."""
+    return [executor.submit(corrupt_pair, item, index, source_file) for item in sanitized]
+
+def _is_problem(item):
+    return isinstance(item, dict) and item.get("problem_statement") and isinstance(item.get("solution_steps"), list)
+
+def stream_problems(executor, transcript, index=None, source_file=None):
+    """Call 1 streamed. Each problem is sanitized and corrupted as soon as its JSON object closes.
+
+    Yields futures of (item, corruption) in problem order while extraction is
+    still running. If the stream breaks, Call 1 is redone without streaming and
+    only the problems not already dispatched are added. If that fails too, the
+    generator raises once the problems received so far have been yielded.
+    """
+    handoff = queue.Queue()
+    prompt = CALL_1_PROMPT.format(transcript=transcript)
+
+    def produce():
+        parser = JsonArrayStream()
+        seen = []
+
+        def dispatch(item):
+            seen.append(item)
+            print(f"  📥 Problem {len(seen)} extracted: {item['problem_statement'][:50]}...")
+            handoff.put(executor.submit(sanitize_and_corrupt, item, index, source_file))
+
+        try:
+            try:
+                for text in call_llm_stream(prompt):
+                    for item in parser.feed(text):
+                        if not _is_problem(item):
+                            parser.malformed += 1
+                            continue
+                        dispatch(item)
+                if not parser.done:
+                    cache.discard(MODEL, prompt)
+                    raise ValueError("reply ended before the JSON array closed")
+            except Exception as e:
+                print(f"  ⚠️ Call 1 stream broke after {len(seen)} problem(s): {str(e)[:80]}")
+                print("  ↩️ Redoing Call 1 without streaming...")
+                for item in call_llm_json(prompt):
+                    if _is_problem(item) and not any(is_same_problem(kept, item) for kept in seen):
+                        dispatch(item)
+        except Exception as e:
+            handoff.put(RuntimeError(f"Call 1 incomplete after {len(seen)} problem(s): {str(e)[:120]}"))
+            return
+        if parser.malformed:
+            print(f"  ⚠️ Skipped {parser.malformed} malformed problem object(s) in the Call 1 reply.")
+        print(f"Call 1 finished: {len(seen)} problems.")
+        handoff.put(None)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        future = handoff.get()
+        if future is None:
+            return
+        if isinstance(future, Exception):
+            raise future
+        yield future
+
+def build_record(transcript_name, item, corruption):
+    return {
+        "source_file": transcript_name,
+        "original_problem": item["problem_statement"],
+        "solution_steps": corruption["corrupted_steps"],
+        "flawed_step_number": corruption["flaw_step_number"],
+        "explanation": corruption["explanation"],
+        "trap_axiom": corruption["trap_axiom"],
+        "error_category": corruption["error_category"],
+        "status": "unseen"
+    }
+
+def process_transcript(filepath, concurrency=4, window_chars=0, overlap_chars=6000, batch=False,
+                       compact=True, regions=False, region_threshold=DEFAULT_THRESHOLD,
+                       sanitize_batch_tokens=SANITIZE_BATCH_TOKENS, stream=True, dup_threshold=DUP_THRESHOLD):
     transcript_name = os.path.basename(filepath)
     
     with open(filepath, 'r') as f:
         transcript = f.read()
 
-    print("\n--- CALL 1: Extracting problems from transcript ---")
-    raw1 = call_llm(CALL_1_PROMPT.format(transcript=transcript))
-    extracted = json.loads(raw1)
-    print(f"Found {len(extracted)} problems.")
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    raw_transcript = transcript
+    if compact:
+        transcript = compact_transcript(transcript)
+        print(f"Compacted transcript: {len(raw_transcript):,} → {len(transcript):,} chars")
+    if regions:
+        spans = detect_spans(transcript, region_threshold)
+        kept = kept_fraction(transcript, spans)
+        if kept < MIN_KEPT_FRACTION:
+            print(f"⚠️ Problem regions: {len(spans)} span(s), only {kept:.0%} of the transcript. "
+                  f"Falling back to the full transcript (try a lower --region-threshold).")
+        else:
+            print(f"Problem regions: {len(spans)} candidate span(s), {kept:.0%} of the transcript kept")
+            transcript = candidate_text(transcript, spans)
+    if compact or regions:
+        before, after = estimate_tokens(raw_transcript), estimate_tokens(transcript)
+        saved_pct = (1 - after / before) * 100 if before else 0
+        print(f"Call 1 input: ~{before:,} → ~{after:,} tokens ({saved_pct:.1f}% fewer)")
+
+    index = None
+    if dup_threshold > 0:
+        index = ProblemIndex(threshold=dup_threshold)
+        added = index.sync(supabase)
+        for entry in load_queue():
+            if entry["status"] != "rejected":
+                index.add(entry["record"])
+        print(f"Duplicate index: {len(index.entries)} known problem(s) ({added} new from the deck), "
+              f"threshold {dup_threshold}")
+
+    if stream and len(split_windows(transcript, window_chars, overlap_chars)) == 1:
+        print(f"\n--- CALLS 1-3: Streaming extraction; each problem is sanitized and corrupted "
+              f"as it arrives ({concurrency} in flight) ---")
+        futures = stream_problems(executor, transcript, index, transcript_name)
+        total = "?"
+    else:
+        print("\n--- CALL 1: Extracting problems from transcript ---")
+        extracted = extract_problems(executor, transcript, window_chars, overlap_chars)
+        print(f"Found {len(extracted)} problems.")
 
-    print("\n--- CALL 2: Sanitizing solutions ---")
-    raw2 = call_llm(CALL_2_PROMPT.format(extracted=json.dumps(extracted, indent=2)))
-    sanitized = json.loads(raw2)
+        print("\n--- CALL 2: Sanitizing solutions ---")
+        sanitized = sanitize_all(executor, extracted, sanitize_batch_tokens)
 
-    saved = 0
+        print(f"\n--- CALL 3: Corrupting {len(sanitized)} problems ({concurrency} in flight) ---")
+        futures = corrupt_all(executor, sanitized, index, transcript_name)
+        total = len(sanitized)
+
+    writer = DeckWriter(supabase)
+    recovery_path = os.path.join(os.path.dirname(filepath), "recovery_records.jsonl")
+    journal = RecoveryJournal(recovery_path)
     skipped = 0
     recovered = 0
+    queued = 0
+    duplicates = 0
 
-    for i, item in enumerate(sanitized):
-        print(f"\n--- CALL 3: Corrupting problem {i+1}/{len(sanitized)} ---")
-        print(f"Problem: {item['problem_statement'][:80]}...")
-
-        raw3 = call_llm(CALL_3_PROMPT.format(
-            categories=json.dumps(ERROR_CATEGORIES),
-            problem=item['problem_statement'],
-            steps=json.dumps(item['solution_steps'])
-        ))
-        corruption = json.loads(raw3)
-
-        # QUALITY CHECK — you review before saving
-        print(f"\nProblem: {item['problem_statement']}")
-        print(f"Corrupted steps:")
-        for j, step in enumerate(corruption['corrupted_steps'], 1):
-            marker = " ← FLAW" if j == corruption['flaw_step_number'] else ""
-            print(f"  Step {j}: {step}{marker}")
-        print(f"Category: {corruption['error_category']}")
-        print(f"Explanation: {corruption['explanation']}")
-        print(f"Trap Axiom: {corruption['trap_axiom']}")
-
-        # Validate step count — Telegram polls max 10 options
-        if len(corruption['corrupted_steps']) > 10:
-            print(f"  ⚠️ Still {len(corruption['corrupted_steps'])} steps after corruption. Telegram max is 10. Skipping.")
-            skipped += 1
-            continue
-
-        confirm = input("\nPush to database? (y/n): ").strip().lower()
-        if confirm != 'y':
-            print("Skipped.")
-            skipped += 1
-            continue
-
-        record = {
-            "source_file": transcript_name,
-            "original_problem": item["problem_statement"],
-            "solution_steps": corruption["corrupted_steps"],
-            "flawed_step_number": corruption["flaw_step_number"],
-            "explanation": corruption["explanation"],
-            "trap_axiom": corruption["trap_axiom"],
-            "error_category": corruption["error_category"],
-            "status": "unseen"
-        }
-
-        max_retries = 5
-        pushed = False
-        for attempt in range(max_retries):
+    approved = 0
+    try:
+        for i, future in enumerate(futures):
+            print(f"\n--- Reviewing problem {i+1}/{total} ---")
             try:
-                supabase.table("qa_flaw_deck").insert(record).execute()
-                pushed = True
-                break
+                item, corruption = future.result()
+            except DuplicateProblem as e:
+                print(f"  ⏭️ Near-duplicate, no corruption call spent ({e}).")
+                duplicates += 1
+                continue
             except Exception as e:
-                wait = 2 ** attempt * 5  # 5s, 10s, 20s, 40s, 80s
-                print(f"  ⚠️ DB push failed (attempt {attempt+1}/{max_retries}): {str(e)[:80]}")
-                if attempt < max_retries - 1:
-                    print(f"  ⏳ Retrying in {wait}s...")
-                    time.sleep(wait)
-
-        if pushed:
-            saved += 1
-            print("  ✅ Saved to database.")
-        else:
-            # Save to recovery file so nothing is lost
-            recovery_path = os.path.join(os.path.dirname(filepath), "recovery_records.json")
-            existing = []
-            if os.path.exists(recovery_path):
-                with open(recovery_path, 'r') as rf:
-                    existing = json.load(rf)
-            existing.append(record)
-            with open(recovery_path, 'w') as rf:
-                json.dump(existing, rf, indent=2)
-            recovered += 1
-            print(f"  💾 All retries failed. Record saved to {recovery_path}")
-            print(f"     Run: python scripts/push_recovery.py {recovery_path}")
+                print(f"  ⚠️ Corruption failed: {str(e)[:80]}. Skipping.")
+                skipped += 1
+                continue
+
+            record = build_record(transcript_name, item, corruption)
+
+            # QUALITY CHECK — you review before saving
+            if not batch:
+                print_record(record)
+
+            if batch:
+                if enqueue(record):
+                    if index:
+                        index.add(record)
+                    queued += 1
+                    print("  📝 Queued for review.")
+                else:
+                    skipped += 1
+                    print("  ⏭️ Already in the review queue.")
+                continue
+
+            confirm = input("\nPush to database? (y/n): ").strip().lower()
+            if confirm != 'y':
+                print("Skipped.")
+                skipped += 1
+                continue
+
+            # Journal (fsync'd) first, so a crash or Ctrl-C before the next upsert loses nothing
+            journal.append([record])
+            approved += 1
+            if index:
+                index.add(record)
+            print("  ✅ Approved.")
+            if approved % CHUNK_SIZE == 0:
+                journal.replay(writer, CHUNK_SIZE)
+    finally:
+        # Upsert whatever is still journaled, also on Ctrl-C; failures stay in the journal
+        if approved:
+            _, recovered = journal.replay(writer, CHUNK_SIZE)
+
+    if index:
+        index.save()
+    saved = writer.inserted
+    if recovered:
+        print(f"  💾 {recovered} record(s) could not be written. They stay journaled in {recovery_path}")
+        print(f"     Run: python scripts/push_recovery.py {recovery_path}")
+    if not batch:
+        print(f"Database: {writer.summary()}")
 
     print(f"\nDone. {saved} saved, {skipped} skipped", end="")
+    if duplicates > 0:
+        print(f", {duplicates} near-duplicate(s) dropped", end="")
     if recovered > 0:
         print(f", {recovered} saved to recovery file", end="")
+    if queued > 0:
+        print(f", {queued} queued for review", end="")
     print(f" from {transcript_name}.")
+    if queued > 0:
+        print("Review with: python scripts/review_queue.py review")
+    print(cache.summary())
+    print(clients.summary())
+    executor.shutdown()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract, sanitize and corrupt problems from a class transcript.")
+    parser.add_argument("transcript", help="Path to a transcript .txt file")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Max Gemini requests in flight at once (default: 4)")
+    parser.add_argument("--rpm", type=int, default=10,
+                        help="Gemini requests per minute shared by all workers (default: 10)")
+    parser.add_argument("--window-chars", type=int, default=0,
+                        help="Split Call 1 into overlapping windows of this many characters, "
+                             "extracted in parallel (default: 0, whole transcript in one call)")
+    parser.add_argument("--overlap-chars", type=int, default=6000,
+                        help="Characters shared by neighbouring windows; must exceed the longest "
+                             "single problem discussion (default: 6000)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Unattended: queue every valid corruption in review/queue.jsonl "
+                             "instead of asking y/n (review later with review_queue.py)")
+    parser.add_argument("--sanitize-batch-tokens", type=int, default=None,
+                        help=f"Approximate input tokens per Call 2 request; 0 sanitizes each problem "
+                             f"separately (default: {SANITIZE_BATCH_TOKENS}). Needs --no-stream or "
+                             "--window-chars: streamed problems are sanitized one at a time")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Wait for the complete Call 1 reply before starting Calls 2 and 3")
+    parser.add_argument("--dup-threshold", type=float, default=DUP_THRESHOLD,
+                        help="Skip Call 3 for problems at least this similar to one already in the deck "
+                             f"or review queue; 0 disables the check (default: {DUP_THRESHOLD})")
+    parser.add_argument("--no-compact", action="store_true",
+                        help="Send the raw transcript (skip filler/repetition stripping before Call 1)")
+    parser.add_argument("--regions", action="store_true",
+                        help="Send only locally detected problem-solving regions to Call 1")
+    parser.add_argument("--region-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Score a region needs to be kept with --regions (default: {DEFAULT_THRESHOLD}; "
+                             "tune with scripts/problem_regions.py --labels)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore cached Gemini responses (fresh answers are still cached)")
+    args = parser.parse_args()
+    if args.window_chars and args.overlap_chars * 2 >= args.window_chars:
+        parser.error("--overlap-chars must be less than half of --window-chars")
+    if args.sanitize_batch_tokens is None:
+        args.sanitize_batch_tokens = SANITIZE_BATCH_TOKENS
+    elif not args.no_stream and not args.window_chars:
+        parser.error("--sanitize-batch-tokens has no effect when streaming; add --no-stream")
+    return args
 
 if __name__ == "__main__":
-    process_transcript(sys.argv[1])
+    args = parse_args()
+    limiter = TokenBucket(rate_per_minute=args.rpm)
+    cache.bypass = cache.bypass or args.no_cache
+    process_transcript(args.transcript, concurrency=args.concurrency,
+                       window_chars=args.window_chars, overlap_chars=args.overlap_chars,
+                       batch=args.batch, compact=not args.no_compact,
+                       regions=args.regions, region_threshold=args.region_threshold,
+                       sanitize_batch_tokens=args.sanitize_batch_tokens, stream=not args.no_stream,
+                       dup_threshold=args.dup_threshold)
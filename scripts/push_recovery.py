@@ -1,56 +1,59 @@
-"""Push recovery records that failed to save during process_transcript.py"""
+"""Replay the recovery journal written when process_transcript.py could not save records.
+
+Usage:
+    python scripts/push_recovery.py transcripts/recovery_records.jsonl [--batch-size 50]
+
+Replay is resumable: acknowledged records are checkpointed after every batch,
+and the journal is deleted once everything has been pushed. A legacy
+recovery_records.json array is imported into a journal first.
+"""
 import os
 import json
-import sys
-import time
-from supabase import create_client
+import argparse
 from dotenv import load_dotenv
 
+from clients import supabase
+from deck_writer import DeckWriter
+from recovery_journal import RecoveryJournal
+
 load_dotenv()
 
-supabase = create_client(os.environ["SUPABASE_URL"].strip(), os.environ["SUPABASE_KEY"].strip())
 
-def push_recovery(filepath):
+def import_legacy(filepath):
+    """Move a pre-journal recovery_records.json array into a .jsonl journal."""
+    journal_path = os.path.splitext(filepath)[0] + ".jsonl"
     with open(filepath, 'r') as f:
         records = json.load(f)
-
-    print(f"Found {len(records)} records to push.\n")
-    pushed = 0
-    failed = []
-
-    for i, record in enumerate(records):
-        print(f"Pushing {i+1}/{len(records)}: {record['original_problem'][:60]}...")
-        max_retries = 5
-        success = False
-        for attempt in range(max_retries):
-            try:
-                supabase.table("qa_flaw_deck").insert(record).execute()
-                success = True
-                break
-            except Exception as e:
-                wait = 2 ** attempt * 5
-                print(f"  ⚠️ Attempt {attempt+1}/{max_retries} failed: {str(e)[:80]}")
-                if attempt < max_retries - 1:
-                    print(f"  ⏳ Retrying in {wait}s...")
-                    time.sleep(wait)
-
-        if success:
-            pushed += 1
-            print("  ✅ Pushed.")
-        else:
-            failed.append(record)
-            print("  ❌ Still failing.")
-
-    if failed:
-        with open(filepath, 'w') as f:
-            json.dump(failed, f, indent=2)
-        print(f"\nDone. {pushed} pushed, {len(failed)} still failed (kept in {filepath}).")
+    RecoveryJournal(journal_path).append(records)
+    os.remove(filepath)
+    print(f"Imported {len(records)} legacy records into {journal_path}.")
+    return journal_path
+
+def push_recovery(filepath, batch_size=50):
+    if filepath.endswith(".json"):
+        filepath = import_legacy(filepath)
+
+    journal = RecoveryJournal(filepath)
+    pending = journal.pending_count()
+    if journal.read_checkpoint():
+        print(f"Resuming from checkpoint at byte {journal.read_checkpoint()}.")
+    print(f"Found {pending} records to push.\n")
+
+    writer = DeckWriter(supabase, chunk_size=batch_size)
+    pushed, remaining = journal.replay(writer, batch_size=batch_size)
+    print(f"  {writer.summary()}")
+
+    if remaining:
+        print(f"\nDone. {pushed} pushed, {remaining} still pending (journal kept at {filepath}; rerun to resume).")
     else:
-        os.remove(filepath)
-        print(f"\nDone. All {pushed} records pushed. Recovery file deleted.")
+        print(f"\nDone. All {pushed} records pushed. Journal compacted and removed.")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay qa_flaw_deck records that failed to save.")
+    parser.add_argument("journal", help="Recovery journal (.jsonl) or legacy recovery_records.json")
+    parser.add_argument("--batch-size", type=int, default=50, help="Records per upsert (default: 50)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python scripts/push_recovery.py <recovery_file.json>")
-        sys.exit(1)
-    push_recovery(sys.argv[1])
+    args = parse_args()
+    push_recovery(args.journal, batch_size=args.batch_size)
@@ -0,0 +1,57 @@
+"""Token-bucket rate limiter shared by concurrent Gemini callers."""
+import re
+import threading
+import time
+
+RETRY_DELAY_RE = re.compile(r"retry(?:Delay|[_ ]in)['\"]?\s*[:=]?\s*['\"]?(\d+(?:\.\d+)?)\s*s", re.IGNORECASE)
+
+
+class TokenBucket:
+    """Hands out at most `rate_per_minute` requests per minute across all threads.
+
+    Up to `burst` tokens can accumulate while idle. When the API answers with a
+    429, `cool_down()` empties the bucket and holds every caller until the
+    quota window has passed, instead of each worker sleeping on its own.
+    """
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = burst or max(1, min(rate_per_minute, 5))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        start = max(self.updated_at, self.resume_at)
+        if now > start:
+            self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate_per_minute / 60)
+        self.updated_at = max(now, self.updated_at)
+
+    def acquire(self):
+        """Block until a request slot is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.resume_at and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.resume_at - now, (1 - self.tokens) * 60 / self.rate_per_minute)
+            time.sleep(wait)
+
+    def cool_down(self, seconds=None):
+        """Drain the bucket and pause all callers. Returns the pause in seconds."""
+        if seconds is None:
+            seconds = max(10.0, 60 / self.rate_per_minute)
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = 0.0
+            self.resume_at = max(self.resume_at, now + seconds)
+            return self.resume_at - now
+
+
+def retry_after(error):
+    """Pull the server-suggested retry delay out of a 429 error, if present."""
+    match = RETRY_DELAY_RE.search(str(error))
+    return float(match.group(1)) if match else None
@@ -0,0 +1,147 @@
+"""Append-only JSONL journal for qa_flaw_deck records that could not be written.
+
+Each line is {"id": <content hash>, "record": {...}} and is fsync'd before
+append() returns, so a crash can at worst tear the line being written. Replay
+keeps a byte-offset checkpoint next to the journal (<journal>.checkpoint):
+everything before the offset has been acknowledged by the database, so an
+interrupted replay resumes where it stopped. Once every record is
+acknowledged the journal and its checkpoint are removed.
+"""
+import json
+import os
+import threading
+
+from deck_writer import content_hash
+
+
+def ends_torn(path):
+    """True if the file's last line has no newline (an append was interrupted)."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+class RecoveryJournal:
+    def __init__(self, path):
+        self.path = path
+        self.checkpoint_path = path + ".checkpoint"
+        self.lock = threading.Lock()
+
+    def append(self, records):
+        """Durably append records. Only the new lines are written, never the whole file."""
+        records = list(records)
+        if not records:
+            return
+        lines = "".join(
+            json.dumps({"id": content_hash(r), "record": r}, ensure_ascii=False) + "\n"
+            for r in records
+        )
+        with self.lock:
+            if ends_torn(self.path):
+                lines = "\n" + lines  # seal a torn line so the new records start clean
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, offset):
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def entries(self, start=0):
+        """Yield (end_offset, entry) for every complete line at or after `start`."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    return  # torn final line: the append never completed
+                offset += len(raw)
+                try:
+                    entry = json.loads(raw)
+                except json.JSONDecodeError:
+                    continue
+                yield offset, entry
+
+    def pending_count(self):
+        return sum(1 for _ in self.entries(self.read_checkpoint()))
+
+    def replay(self, writer, batch_size=50):
+        """Push unacknowledged records in batches, checkpointing after each one.
+
+        Stops at the first batch that still fails after the writer's retries, so
+        the next run resumes from that batch. Returns (acknowledged, remaining).
+        """
+        acknowledged = 0
+        batch, batch_end = [], self.read_checkpoint()
+        for end, entry in self.entries(batch_end):
+            batch.append(entry["record"])
+            batch_end = end
+            if len(batch) >= batch_size:
+                if not self._push_batch(writer, batch, batch_end):
+                    return acknowledged, self.pending_count()
+                acknowledged += len(batch)
+                batch = []
+        if batch:
+            if not self._push_batch(writer, batch, batch_end):
+                return acknowledged, self.pending_count()
+            acknowledged += len(batch)
+
+        self.compact()
+        return acknowledged, self.pending_count()
+
+    def _push_batch(self, writer, batch, end_offset):
+        failed_before = len(writer.failed)
+        writer.extend(batch)
+        writer.flush()
+        if len(writer.failed) > failed_before:
+            return False
+        self.write_checkpoint(end_offset)
+        return True
+
+    def compact(self):
+        """Drop acknowledged lines. Removes both files once nothing is left."""
+        with self.lock:
+            start = self.read_checkpoint()
+            remaining = list(self._raw_lines(start))
+            # The checkpoint is reset before the journal changes: a crash in
+            # between only replays acknowledged lines (an idempotent upsert),
+            # never applies the old offset to a shorter file.
+            if not remaining:
+                for path in (self.checkpoint_path, self.path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                return
+            if start == 0:
+                return
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.writelines(remaining)
+                f.flush()
+                os.fsync(f.fileno())
+            self.write_checkpoint(0)
+            os.replace(tmp_path, self.path)
+
+    def _raw_lines(self, start):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            for raw in f:
+                if raw.endswith(b"\n"):
+                    yield raw
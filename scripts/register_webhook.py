@@ -1,9 +1,10 @@
 import os
 import sys
 import asyncio
-from telegram import Bot
 from dotenv import load_dotenv
 
+from clients import bot
+
 load_dotenv()
 
 # ─── IMPORTANT: Set your Edge Function URL here ───
@@ -18,8 +19,6 @@ EDGE_FUNCTION_URL = os.environ.get(
 )
 
 async def register():
-    bot = Bot(token=os.environ["TELEGRAM_TOKEN"].strip())
-    
     if "your-project-ref" in EDGE_FUNCTION_URL:
         print("❌ ERROR: You need to set your Edge Function URL first!")
         print("   Edit EDGE_FUNCTION_URL in this file, or set SPRINT_WEBHOOK_URL env var.")
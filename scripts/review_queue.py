@@ -0,0 +1,175 @@
+"""Offline review queue for corruptions produced by `process_transcript.py --batch`.
+
+Batch mode appends every validated corruption here instead of stopping for
+y/n. Review them later, in bulk, and push everything approved in one go.
+
+Usage:
+    python scripts/review_queue.py list [--status pending]
+    python scripts/review_queue.py review              # walk pending items, y/n/s/q each
+    python scripts/review_queue.py approve <id> [<id> ...] | all
+    python scripts/review_queue.py reject <id> [<id> ...] | all
+    python scripts/review_queue.py push                # upsert all approved records
+"""
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+
+from deck_writer import DeckWriter, content_hash
+from recovery_journal import ends_torn
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_QUEUE_PATH = os.path.join(PROJECT_DIR, "review", "queue.jsonl")
+
+_append_lock = threading.Lock()
+
+
+def entry_id(record):
+    return content_hash(record)[:10]
+
+
+def load_queue(path=DEFAULT_QUEUE_PATH):
+    if not os.path.exists(path):
+        return []
+    entries = {}
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from an interrupted run
+            entries[entry["id"]] = entry
+    return list(entries.values())
+
+
+def save_queue(entries, path=DEFAULT_QUEUE_PATH):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+
+def enqueue(record, path=DEFAULT_QUEUE_PATH):
+    """Append a record as pending. Returns False if it was already queued or decided."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _append_lock:
+        rid = entry_id(record)
+        if any(e["id"] == rid for e in load_queue(path)):
+            return False
+        entry = {"id": rid, "status": "pending", "queued_at": datetime.now().isoformat(), "record": record}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        if ends_torn(path):
+            line = "\n" + line  # seal a torn line so the new entry is not glued onto it
+        with open(path, "a") as f:
+            f.write(line)
+        return True
+
+
+def print_record(record):
+    print(f"\nProblem: {record['original_problem']}")
+    print(f"Corrupted steps:")
+    for j, step in enumerate(record['solution_steps'], 1):
+        marker = " ← FLAW" if j == record['flawed_step_number'] else ""
+        print(f"  Step {j}: {step}{marker}")
+    print(f"Category: {record['error_category']}")
+    print(f"Explanation: {record['explanation']}")
+    print(f"Trap Axiom: {record['trap_axiom']}")
+
+
+def list_entries(status=None, path=DEFAULT_QUEUE_PATH):
+    entries = [e for e in load_queue(path) if status is None or e["status"] == status]
+    for e in entries:
+        print(f"  {e['id']}  [{e['status']:8}] {e['record']['source_file']}: {e['record']['original_problem'][:60]}...")
+    counts = {}
+    for e in load_queue(path):
+        counts[e["status"]] = counts.get(e["status"], 0) + 1
+    print(f"\n{len(entries)} shown. " + ", ".join(f"{n} {s}" for s, n in sorted(counts.items())))
+
+
+def set_status(ids, status, path=DEFAULT_QUEUE_PATH):
+    entries = load_queue(path)
+    select_all = ids == ["all"]
+    changed = 0
+    for e in entries:
+        if e["status"] == "pending" and (select_all or e["id"] in ids):
+            e["status"] = status
+            changed += 1
+    save_queue(entries, path)
+    print(f"{changed} item(s) marked {status}.")
+
+
+def review(path=DEFAULT_QUEUE_PATH):
+    """Walk pending items one by one. Decisions are saved locally; nothing touches the DB."""
+    entries = load_queue(path)
+    pending = [e for e in entries if e["status"] == "pending"]
+    print(f"{len(pending)} pending item(s). y = approve, n = reject, s = skip, q = stop.")
+    for i, e in enumerate(pending):
+        print(f"\n--- {i+1}/{len(pending)} · {e['id']} · {e['record']['source_file']} ---")
+        print_record(e["record"])
+        answer = input("\nApprove? (y/n/s/q): ").strip().lower()
+        if answer == "q":
+            break
+        if answer == "y":
+            e["status"] = "approved"
+        elif answer == "n":
+            e["status"] = "rejected"
+    save_queue(entries, path)
+    approved = sum(1 for e in entries if e["status"] == "approved")
+    print(f"\n{approved} approved item(s) waiting. Run: python scripts/review_queue.py push")
+
+
+def push(path=DEFAULT_QUEUE_PATH):
+    from clients import supabase
+
+    entries = load_queue(path)
+    approved = [e for e in entries if e["status"] == "approved"]
+    if not approved:
+        print("Nothing approved to push.")
+        return
+
+    print(f"Pushing {len(approved)} approved record(s)...")
+    writer = DeckWriter(supabase)
+    writer.extend(e["record"] for e in approved)
+    writer.flush()
+    failed_ids = {entry_id(r) for r in writer.failed}
+
+    for e in approved:
+        if e["id"] not in failed_ids:
+            e["status"] = "pushed"
+    save_queue(entries, path)
+    print(f"  ✅ {writer.summary()}")
+    if failed_ids:
+        print("  ❌ Failed items stay approved in the queue; run push again later.")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Review corruptions queued by process_transcript.py --batch.")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="Queue file (default: review/queue.jsonl)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    list_parser = sub.add_parser("list")
+    list_parser.add_argument("--status", choices=["pending", "approved", "rejected", "pushed"])
+    sub.add_parser("review")
+    for name in ("approve", "reject"):
+        p = sub.add_parser(name)
+        p.add_argument("ids", nargs="+", help="Item ids from `list`, or `all` for every pending item")
+    sub.add_parser("push")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "list":
+        list_entries(args.status, args.queue)
+    elif args.command == "review":
+        review(args.queue)
+    elif args.command == "approve":
+        set_status(args.ids, "approved", args.queue)
+    elif args.command == "reject":
+        set_status(args.ids, "rejected", args.queue)
+    elif args.command == "push":
+        push(args.queue)
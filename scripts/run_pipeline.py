@@ -0,0 +1,300 @@
+"""Checkpointed audio → deck pipeline: transcribe → extract → sanitize → corrupt → review → push.
+
+Every stage saves its result to .pipeline/<source>/<stage>.json before the
+next stage starts. A crash or Ctrl-C therefore loses at most the stage in
+flight, and a rerun resumes each file at its first unfinished stage.
+Several files run at once. Their Gemini calls share one executor and the
+--rpm limiter.
+
+Review stays human but offline. The review stage queues corruptions in
+review/queue.jsonl (see review_queue.py). Once none of a file's items are
+still pending, the push stage upserts its approved records. Run the pipeline
+again after reviewing to push.
+
+Usage:
+    python scripts/run_pipeline.py                                   # every audio file in audio/
+    python scripts/run_pipeline.py audio/class_18.m4a transcripts/qa_dec20.txt
+    python scripts/run_pipeline.py --files 2 --concurrency 4 --rpm 10
+    python scripts/run_pipeline.py --redo-from sanitize transcripts/qa_dec20.txt
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import clients
+import process_transcript as pt
+from deck_writer import DeckWriter
+from llm_cache import cache
+from problem_index import DEFAULT_THRESHOLD as DUP_THRESHOLD, ProblemIndex
+from rate_limiter import TokenBucket
+from review_queue import enqueue, entry_id, load_queue, save_queue
+from transcription_manifest import PROJECT_DIR, load_manifest, stale_reason
+
+PIPELINE_DIR = os.path.join(PROJECT_DIR, ".pipeline")
+TRANSCRIPTS_DIR = os.path.join(PROJECT_DIR, "transcripts")
+STAGES = ("transcribe", "extract", "sanitize", "corrupt", "review", "push")
+
+
+class WaitingForReview(Exception):
+    """The push stage cannot finish while some of the file's items are still pending."""
+
+    def __init__(self, pending):
+        super().__init__(f"{pending} item(s) pending review")
+        self.pending = pending
+
+
+def source_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def checkpoint_path(name, stage):
+    return os.path.join(PIPELINE_DIR, name, f"{STAGES.index(stage) + 1}_{stage}.json")
+
+
+def load_checkpoint(name, stage):
+    path = checkpoint_path(name, stage)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_checkpoint(name, stage, data, elapsed):
+    path = checkpoint_path(name, stage)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "stage": stage,
+            "completed_at": datetime.now().isoformat(timespec="seconds"),
+            "elapsed_seconds": round(elapsed, 2),
+            "data": data,
+        }, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def clear_checkpoints(name, from_stage):
+    for stage in STAGES[STAGES.index(from_stage):]:
+        path = checkpoint_path(name, stage)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class Pipeline:
+    def __init__(self, concurrency=4, window_chars=0, overlap_chars=6000, compact=True,
+                 dup_threshold=DUP_THRESHOLD, model_name=None):
+        self.llm = ThreadPoolExecutor(max_workers=concurrency)
+        self.window_chars = window_chars
+        self.overlap_chars = overlap_chars
+        self.compact = compact
+        self.model_name = model_name
+        self.whisper_model = None
+        self.whisper_lock = threading.Lock()  # one transcription at a time; it already uses every core
+        self.queue_lock = threading.Lock()
+        self.index = None
+        if dup_threshold > 0:
+            self.index = ProblemIndex(threshold=dup_threshold)
+            self.index.sync(pt.supabase)
+            for entry in load_queue():
+                if entry["status"] != "rejected":
+                    self.index.add(entry["record"])
+
+    def run(self, path):
+        """Run one file from its first unfinished stage. Returns (name, timings, status)."""
+        name = source_name(path)
+        results, timings = {}, {}
+        for stage in STAGES:
+            checkpoint = load_checkpoint(name, stage)
+            if checkpoint:
+                results[stage] = checkpoint["data"]
+                timings[stage] = None
+                continue
+            print(f"▶️  {name}: {stage}")
+            start = time.perf_counter()
+            try:
+                data = getattr(self, f"stage_{stage}")(path, results)
+            except WaitingForReview as e:
+                print(f"⏸️  {name}: {e.pending} item(s) still pending. "
+                      "Run review_queue.py review, then rerun the pipeline to push.")
+                return name, timings, f"waiting for review ({e.pending} pending)"
+            except Exception as e:
+                print(f"❌  {name}: {stage} failed: {str(e)[:120]}")
+                return name, timings, f"failed at {stage}"
+            timings[stage] = time.perf_counter() - start
+            save_checkpoint(name, stage, data, timings[stage])
+            results[stage] = data
+        return name, timings, "done"
+
+    def stage_transcribe(self, path, results):
+        if path.endswith(".txt"):
+            return {"transcript": os.path.abspath(path)}
+        output_path = os.path.join(TRANSCRIPTS_DIR, source_name(path) + ".txt")
+        with self.whisper_lock:
+            if stale_reason(load_manifest(), path, output_path) is None:
+                print(f"   {source_name(path)}: transcript up to date")
+                return {"transcript": output_path}
+            from transcribe import DEFAULT_MODEL, transcribe
+            import whisper
+
+            model_name = self.model_name or DEFAULT_MODEL
+            if self.whisper_model is None:
+                print(f"Loading Whisper model '{model_name}'...")
+                self.whisper_model = whisper.load_model(model_name)
+            return {"transcript": transcribe(path, self.whisper_model, model_name)}
+
+    def stage_extract(self, path, results):
+        with open(results["transcribe"]["transcript"], "r") as f:
+            transcript = f.read()
+        if self.compact:
+            transcript = pt.compact_transcript(transcript)
+        problems = pt.extract_problems(self.llm, transcript, self.window_chars, self.overlap_chars)
+        print(f"   {source_name(path)}: {len(problems)} problems extracted")
+        return {"problems": problems}
+
+    def stage_sanitize(self, path, results):
+        return {"problems": pt.sanitize_all(self.llm, results["extract"]["problems"])}
+
+    def stage_corrupt(self, path, results):
+        sanitized = results["sanitize"]["problems"]
+        transcript_name = os.path.basename(results["transcribe"]["transcript"])
+        outcomes = []
+        for item, future in zip(sanitized, pt.corrupt_all(self.llm, sanitized, self.index, transcript_name)):
+            try:
+                outcomes.append({"item": item, "corruption": future.result()[1]})
+            except pt.DuplicateProblem as e:
+                outcomes.append({"item": item, "duplicate": str(e)})
+            except Exception as e:
+                outcomes.append({"item": item, "error": str(e)[:200]})
+        corrupted = sum(1 for o in outcomes if "corruption" in o)
+        print(f"   {source_name(path)}: {corrupted}/{len(outcomes)} corrupted, "
+              f"{sum(1 for o in outcomes if 'duplicate' in o)} near-duplicate(s) skipped")
+        return {"outcomes": outcomes}
+
+    def stage_review(self, path, results):
+        transcript_name = os.path.basename(results["transcribe"]["transcript"])
+        ids, queued = [], 0
+        for outcome in results["corrupt"]["outcomes"]:
+            if "corruption" not in outcome:
+                continue
+            record = pt.build_record(transcript_name, outcome["item"], outcome["corruption"])
+            with self.queue_lock:
+                if enqueue(record):
+                    queued += 1
+            if self.index:
+                self.index.add(record)
+            ids.append(entry_id(record))
+        print(f"   {source_name(path)}: {queued} queued for review")
+        return {"ids": ids, "queued": queued}
+
+    def stage_push(self, path, results):
+        ids = set(results["review"]["ids"])
+        with self.queue_lock:
+            entries = load_queue()
+            mine = [e for e in entries if e["id"] in ids]
+            pending = sum(1 for e in mine if e["status"] == "pending")
+            if pending:
+                raise WaitingForReview(pending)
+            approved = [e for e in mine if e["status"] == "approved"]
+            writer = DeckWriter(pt.supabase)
+            writer.extend(e["record"] for e in approved)
+            writer.flush()
+            failed_ids = {entry_id(r) for r in writer.failed}
+            for e in approved:
+                if e["id"] not in failed_ids:
+                    e["status"] = "pushed"
+            save_queue(entries)
+        if failed_ids:
+            raise Exception(f"{len(failed_ids)} record(s) could not be written; they stay approved for the next run")
+        print(f"   {source_name(path)}: {writer.summary()}")
+        return {"pushed": writer.inserted, "duplicates": writer.duplicates,
+                "rejected": sum(1 for e in mine if e["status"] == "rejected")}
+
+    def close(self):
+        if self.index:
+            self.index.save()
+        self.llm.shutdown()
+
+
+def print_summary(rows, wall_seconds):
+    print("\n=== Pipeline summary (seconds; · = resumed from checkpoint) ===")
+    width = max([len(name) for name, _, _ in rows] + [6])
+    print(f"{'source':<{width}}  " + "  ".join(f"{s:>10}" for s in STAGES) + "  status")
+    totals = dict.fromkeys(STAGES, 0.0)
+    for name, timings, status in rows:
+        cells = []
+        for stage in STAGES:
+            if stage not in timings:
+                cells.append(f"{'-':>10}")
+            elif timings[stage] is None:
+                cells.append(f"{'·':>10}")
+            else:
+                totals[stage] += timings[stage]
+                cells.append(f"{timings[stage]:>10.1f}")
+        print(f"{name:<{width}}  " + "  ".join(cells) + f"  {status}")
+    print(f"{'total':<{width}}  " + "  ".join(f"{totals[s]:>10.1f}" for s in STAGES))
+    print(f"\nWall time {wall_seconds:.1f}s. {cache.summary()}")
+    print(clients.summary())
+
+
+def find_sources(paths):
+    if paths:
+        return paths
+    from batch_transcribe import find_audio_files
+    return find_audio_files()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run audio/transcripts through every stage with checkpoints.")
+    parser.add_argument("sources", nargs="*",
+                        help="Audio files or transcript .txt files (default: every audio file in audio/)")
+    parser.add_argument("--files", type=int, default=2, help="Files processed at the same time (default: 2)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Max Gemini requests in flight across all files (default: 4)")
+    parser.add_argument("--rpm", type=int, default=10,
+                        help="Gemini requests per minute shared by all files (default: 10)")
+    parser.add_argument("--window-chars", type=int, default=0,
+                        help="Split Call 1 into overlapping windows of this many characters (default: 0)")
+    parser.add_argument("--overlap-chars", type=int, default=6000,
+                        help="Characters shared by neighbouring windows (default: 6000)")
+    parser.add_argument("--dup-threshold", type=float, default=DUP_THRESHOLD,
+                        help=f"Near-duplicate similarity that skips Call 3; 0 disables (default: {DUP_THRESHOLD})")
+    parser.add_argument("--model", default=None, help="Whisper model for audio sources (default: base)")
+    parser.add_argument("--no-compact", action="store_true", help="Send raw transcripts to Call 1")
+    parser.add_argument("--redo-from", choices=STAGES,
+                        help="Discard checkpoints from this stage on before running")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore cached Gemini responses (fresh answers are still cached)")
+    args = parser.parse_args()
+    if args.window_chars and args.overlap_chars * 2 >= args.window_chars:
+        parser.error("--overlap-chars must be less than half of --window-chars")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    pt.limiter = TokenBucket(rate_per_minute=args.rpm)
+    cache.bypass = cache.bypass or args.no_cache
+
+    sources = find_sources(args.sources)
+    if not sources:
+        print("No audio files found in audio/ and no sources given.")
+        raise SystemExit(0)
+    if args.redo_from:
+        for path in sources:
+            clear_checkpoints(source_name(path), args.redo_from)
+
+    print(f"=== Pipeline: {len(sources)} source(s), {args.files} at a time ===\n")
+    started = time.perf_counter()
+    pipeline = Pipeline(concurrency=args.concurrency, window_chars=args.window_chars,
+                        overlap_chars=args.overlap_chars, compact=not args.no_compact,
+                        dup_threshold=args.dup_threshold, model_name=args.model)
+    try:
+        with ThreadPoolExecutor(max_workers=args.files) as files:
+            rows = list(files.map(pipeline.run, sources))
+    finally:
+        pipeline.close()
+    print_summary(rows, time.perf_counter() - started)
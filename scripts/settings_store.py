@@ -0,0 +1,69 @@
+"""Run-scoped access to the `settings` key-value table.
+
+A delivery job names the keys it needs up front; they are fetched with one
+`in_` query and served from memory for the rest of the run. Writes are held
+back and sent as a single upsert by flush(), which the job calls once at the
+end (in a finally block, so state changes survive a failed Telegram send).
+
+    from settings_store import settings
+
+    settings.prefetch(FLAW_BUTTON_KEY, FLAW_SESSION_KEY)
+    button = settings.get_json(FLAW_BUTTON_KEY, None)
+    settings.set_json(FLAW_SESSION_KEY, None)
+    settings.flush()
+"""
+import json
+
+from clients import supabase
+
+
+class SettingsStore:
+    def __init__(self, client):
+        self.client = client
+        self.values = {}
+        self.dirty = {}
+        self.queries = 0
+
+    def prefetch(self, *keys):
+        """Load every key not already cached in one query. Missing keys cache as None."""
+        missing = [k for k in keys if k not in self.values]
+        if not missing:
+            return
+        self.queries += 1
+        rows = self.client.table("settings").select("key, value").in_("key", missing).execute().data or []
+        self.values.update(dict.fromkeys(missing))
+        for row in rows:
+            self.values[row["key"]] = row.get("value")
+
+    def get(self, key):
+        self.prefetch(key)
+        return self.values[key]
+
+    def get_json(self, key, default):
+        raw = self.get(key)
+        if not raw:
+            return default
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return default
+
+    def set(self, key, value):
+        self.values[key] = value
+        self.dirty[key] = value
+
+    def set_json(self, key, value):
+        self.set(key, json.dumps(value, separators=(",", ":")))
+
+    def flush(self):
+        """Write every pending change in one upsert. Returns the number of keys written."""
+        if not self.dirty:
+            return 0
+        rows = [{"key": k, "value": v} for k, v in self.dirty.items()]
+        self.queries += 1
+        self.client.table("settings").upsert(rows).execute()
+        self.dirty.clear()
+        return len(rows)
+
+
+settings = SettingsStore(supabase)
@@ -0,0 +1,66 @@
+"""In-memory view of the math_sprints bank for picking a morning sprint.
+
+The bank is small (hundreds to a few thousand rows), so a delivery run loads
+`id, category, times_attempted` once and does every selection step locally:
+
+    pool = SprintPool.load(supabase)
+    questions = pool.select(weak_categories, yesterday_miss_cat)
+
+Rows are kept sorted by times_attempted (least attempted first), overall and
+per category, so "the N least-attempted questions in X" is a slice.
+"""
+import random
+
+COLUMNS = "id, category, times_attempted"
+
+
+class SprintPool:
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda q: q.get("times_attempted") or 0)
+        self.by_category = {}
+        for row in self.rows:
+            self.by_category.setdefault(row.get("category"), []).append(row)
+
+    @classmethod
+    def load(cls, client, page_size=1000):
+        rows, start = [], 0
+        while True:
+            page = client.table("math_sprints").select(COLUMNS)\
+                .range(start, start + page_size - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+            start += page_size
+        return cls(rows)
+
+    def least_attempted(self, category=None, limit=10):
+        rows = self.rows if category is None else self.by_category.get(category, [])
+        return rows[:limit]
+
+    def select(self, weak_categories, yesterday_miss_cat, count=7):
+        """Pick `count` questions with yesterday-miss guarantee + weak spot weighting."""
+        questions = []
+        chosen = set()
+
+        # Priority 1: If yesterday was missed, guarantee 2 from that category
+        if yesterday_miss_cat:
+            candidates = self.least_attempted(yesterday_miss_cat)
+            questions.extend(random.sample(candidates, min(2, len(candidates))))
+            chosen.update(q["id"] for q in questions)
+
+        # Priority 2: One each from up to two weak categories, while fewer than 3 are picked
+        for cat in (weak_categories or [])[:2]:
+            if len(questions) >= 3:
+                break
+            candidates = [q for q in self.least_attempted(cat) if q["id"] not in chosen]
+            if candidates:
+                questions.append(random.choice(candidates))
+                chosen.add(questions[-1]["id"])
+
+        # Priority 3: Fill with random picks from the 50 least-attempted questions
+        candidates = [q for q in self.least_attempted(limit=50) if q["id"] not in chosen]
+        random.shuffle(candidates)
+        questions.extend(candidates[:count - len(questions)])
+
+        random.shuffle(questions)
+        return questions[:count]
@@ -0,0 +1,52 @@
+"""Nightly sprint history retention: roll up old logs, then delete them.
+
+Sessions older than --keep-days have their sprint_logs compacted into
+sprint_daily_stats (answers/correct/debt per IST day and category). The logs
+and sessions are then removed with set-based deletes. Each
+purge_sprint_history() call handles one batch of sessions in a single
+transaction, so an interrupted run never loses history it did not roll up.
+
+Usage:
+    python scripts/sprint_retention.py [--keep-days 7] [--batch-size 500]
+"""
+import argparse
+import time
+
+import clients
+from clients import supabase
+
+
+def purge(keep_days=7, batch_size=500):
+    totals = {"rollup_rows": 0, "logs_deleted": 0, "sessions_deleted": 0}
+    batches = 0
+    start = time.perf_counter()
+    while True:
+        result = supabase.rpc("purge_sprint_history", {
+            "p_keep_days": keep_days,
+            "p_batch_size": batch_size,
+        }).execute().data or {}
+        batches += 1
+        for key in totals:
+            totals[key] += result.get(key) or 0
+        if (result.get("sessions_deleted") or 0) < batch_size:
+            break
+    elapsed = time.perf_counter() - start
+    print(f"🧹 Sprint retention (older than {keep_days} days): "
+          f"{totals['sessions_deleted']} session(s) and {totals['logs_deleted']} log(s) deleted, "
+          f"{totals['rollup_rows']} daily stat row(s) written, {batches} batch(es) in {elapsed:.1f}s")
+    return totals
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compact and purge old sprint sessions and logs.")
+    parser.add_argument("--keep-days", type=int, default=7,
+                        help="Keep sessions created within this many days (default: 7)")
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="Sessions rolled up and deleted per transaction (default: 500)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    purge(args.keep_days, args.batch_size)
+    print(clients.summary())
@@ -1,27 +1,162 @@
 import whisper
-import sys
+import argparse
+import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def transcribe(audio_path):
-    print(f"Loading Whisper model...")
-    model = whisper.load_model("base")  # use "small" for better accuracy
-    
-    print(f"Transcribing {audio_path}... this may take a few minutes.")
-    result = model.transcribe(audio_path)
-    
-    # Always save to transcripts/ directory, regardless of input path
+import numpy as np
+
+from transcription_manifest import load_manifest, record_file, save_manifest
+
+DEFAULT_MODEL = "base"  # use "small" for better accuracy
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+FRAME_SECONDS = 0.1  # energy frame used to find silences
+
+# One model per worker process: set by init_worker, reused for every file or segment it handles
+_worker_model = None
+
+def init_worker(model_name, threads):
+    global _worker_model
+    import torch
+    torch.set_num_threads(threads)
+    _worker_model = whisper.load_model(model_name)
+
+def transcript_path(audio_path):
+    """Always save to transcripts/ directory, regardless of input path."""
     base_name = os.path.splitext(os.path.basename(audio_path))[0]
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_dir = os.path.dirname(script_dir)
     transcripts_dir = os.path.join(project_dir, "transcripts")
     os.makedirs(transcripts_dir, exist_ok=True)
-    output_path = os.path.join(transcripts_dir, base_name + ".txt")
+    return os.path.join(transcripts_dir, base_name + ".txt")
+
+def write_transcript(audio_path, text):
+    # Write then rename, so an interrupted run never leaves a half-written transcript behind
+    output_path = transcript_path(audio_path)
+    tmp_path = output_path + ".partial"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+def record_in_manifest(audio_path, output_path, duration, elapsed, model_name):
+    manifest = load_manifest()
+    record_file(manifest, audio_path, output_path, duration, elapsed, model_name)
+    save_manifest(manifest)
+
+def transcribe(audio_path, model=None, model_name=DEFAULT_MODEL):
+    if model is None:
+        print(f"Loading Whisper model...")
+        model = whisper.load_model(model_name)
+    
+    print(f"Transcribing {audio_path}... this may take a few minutes.")
+    audio = whisper.load_audio(audio_path)
+    start = time.perf_counter()
+    result = model.transcribe(audio)
+    elapsed = time.perf_counter() - start
     
-    with open(output_path, "w") as f:
-        f.write(result["text"])
+    output_path = write_transcript(audio_path, result["text"])
+    record_in_manifest(audio_path, output_path, len(audio) / SAMPLE_RATE, elapsed, model_name)
     
     print(f"Done. Transcript saved to: {output_path}")
     return output_path
 
+def transcribe_in_worker(audio_path):
+    """Whole-file transcription with the worker's preloaded model. Used by batch_transcribe.py."""
+    audio = whisper.load_audio(audio_path)
+    duration = len(audio) / SAMPLE_RATE
+    start = time.perf_counter()
+    result = _worker_model.transcribe(audio)
+    elapsed = time.perf_counter() - start
+    output_path = write_transcript(audio_path, result["text"])
+    return audio_path, output_path, duration, elapsed
+
+# ─────────────────────────────────────────────
+# Segmented mode: split at silences, transcribe segments in parallel
+# ─────────────────────────────────────────────
+
+def find_silence_cuts(audio, segment_seconds=300, search_seconds=20, frame_seconds=FRAME_SECONDS):
+    """Sample offsets to cut at: the quietest frame near every `segment_seconds` mark."""
+    if segment_seconds < 2 * frame_seconds:
+        raise ValueError(f"segment_seconds must be at least {2 * frame_seconds}s (two energy frames)")
+    frame = int(frame_seconds * SAMPLE_RATE)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return []
+    energy = np.sqrt(np.mean(audio[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+
+    cuts = []
+    per_segment = int(segment_seconds / frame_seconds)
+    search = max(1, min(int(search_seconds / frame_seconds), per_segment // 2))
+    target = per_segment
+    while target + search < n_frames:
+        lo, hi = target - search, target + search
+        quietest = lo + int(np.argmin(energy[lo:hi]))
+        cuts.append(quietest * frame)
+        target = quietest + per_segment
+    return cuts
+
+def _transcribe_segment(task):
+    index, offset, samples = task
+    result = _worker_model.transcribe(samples)
+    segments = [
+        {"start": round(s["start"] + offset, 2), "end": round(s["end"] + offset, 2), "text": s["text"].strip()}
+        for s in result["segments"]
+    ]
+    return index, result["text"].strip(), segments
+
+def transcribe_segmented(audio_path, workers=None, model_name=DEFAULT_MODEL, segment_seconds=300):
+    """Split at silence boundaries, transcribe segments across a process pool, stitch in order.
+
+    Writes the text to transcripts/<name>.txt and the timestamped segments
+    (relative to the whole recording) to transcripts/<name>.segments.json.
+    """
+    audio = whisper.load_audio(audio_path)
+    duration = len(audio) / SAMPLE_RATE
+    bounds = [0] + find_silence_cuts(audio, segment_seconds) + [len(audio)]
+    tasks = [(i, start / SAMPLE_RATE, audio[start:end]) for i, (start, end) in enumerate(zip(bounds, bounds[1:]))]
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"Transcribing {audio_path} in {len(tasks)} segment(s) across {workers} worker(s)...")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(model_name, threads)) as pool:
+        results = list(pool.map(_transcribe_segment, tasks))  # map keeps segment order
+    elapsed = time.perf_counter() - start
+
+    text = " ".join(t for _, t, _ in results if t)
+    segments = [s for _, _, segs in results for s in segs]
+    output_path = write_transcript(audio_path, text)
+    with open(os.path.splitext(output_path)[0] + ".segments.json", "w") as f:
+        json.dump(segments, f, indent=2, ensure_ascii=False)
+    record_in_manifest(audio_path, output_path, duration, elapsed, model_name)
+
+    print(f"Done. {duration / 60:.1f} min of audio in {elapsed / 60:.1f} min "
+          f"(RTF {elapsed / duration:.2f}). Transcript saved to: {output_path}")
+    return output_path
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Transcribe a class recording into transcripts/.")
+    parser.add_argument("audio", help="Path to an audio file")
+    parser.add_argument("--segmented", action="store_true",
+                        help="Split at silences and transcribe segments in parallel (long recordings)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for --segmented (default: one per core)")
+    parser.add_argument("--segment-minutes", type=float, default=5,
+                        help="Target segment length for --segmented (default: 5)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Whisper model (default: {DEFAULT_MODEL})")
+    args = parser.parse_args()
+    if args.segment_minutes * 60 < 2 * FRAME_SECONDS:
+        parser.error(f"--segment-minutes must be at least {2 * FRAME_SECONDS / 60:.4f} (two {FRAME_SECONDS}s frames)")
+    return args
+
 if __name__ == "__main__":
-    transcribe(sys.argv[1])
+    args = parse_args()
+    if args.segmented:
+        transcribe_segmented(args.audio, workers=args.workers, model_name=args.model,
+                             segment_seconds=args.segment_minutes * 60)
+    else:
+        transcribe(args.audio, model_name=args.model)
@@ -0,0 +1,113 @@
+"""Manifest of completed transcriptions: transcripts/manifest.json.
+
+For every audio file it records the audio content hash, duration, Whisper
+model, elapsed time and a hash of the transcript it produced. A file is
+(re)transcribed when it is new, its audio changed, or its transcript is
+missing or no longer matches the recorded hash (e.g. a run that died while
+writing). Each batch run also appends its throughput numbers.
+
+Transcripts imported from NotebookLM HTML exports (ingest_html.py) are
+recorded under "imports", keyed by the same audio file name, so a later
+batch run does not redo them with Whisper.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANIFEST_PATH = os.path.join(PROJECT_DIR, "transcripts", "manifest.json")
+MAX_RUNS_KEPT = 50
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {"files": {}, "runs": [], "imports": {}}
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    manifest.setdefault("imports", {})
+    return manifest
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def audio_fingerprint(audio_path, entry=None):
+    """Hash of the audio. Reuses the recorded hash when size and mtime are unchanged."""
+    stat = os.stat(audio_path)
+    if entry and entry.get("audio_bytes") == stat.st_size and entry.get("audio_mtime") == stat.st_mtime:
+        return entry["audio_sha256"]
+    return file_sha256(audio_path)
+
+
+def stale_reason(manifest, audio_path, output_path):
+    """Why this file needs transcribing, or None if the recorded transcript is still valid."""
+    entry = manifest["files"].get(os.path.basename(audio_path))
+    if entry is None:
+        imported = manifest["imports"].get(os.path.basename(audio_path))
+        if imported and os.path.exists(output_path) and file_sha256(output_path) == imported["output_sha256"]:
+            return None
+        return "existing transcript not in manifest" if os.path.exists(output_path) else "new"
+    if audio_fingerprint(audio_path, entry) != entry["audio_sha256"]:
+        return "audio changed"
+    if not os.path.exists(output_path):
+        return "transcript missing"
+    if file_sha256(output_path) != entry["output_sha256"]:
+        return "transcript incomplete or edited"
+    return None
+
+
+def record_file(manifest, audio_path, output_path, duration, elapsed, model):
+    stat = os.stat(audio_path)
+    manifest["files"][os.path.basename(audio_path)] = {
+        "audio_sha256": audio_fingerprint(audio_path),
+        "audio_bytes": stat.st_size,
+        "audio_mtime": stat.st_mtime,
+        "duration_seconds": round(duration, 1),
+        "model": model,
+        "elapsed_seconds": round(elapsed, 1),
+        "output": os.path.relpath(output_path, PROJECT_DIR),
+        "output_sha256": file_sha256(output_path),
+        "completed_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def record_import(manifest, audio_name, source_path, output_path, elapsed):
+    """Record a transcript taken from an HTML export instead of transcribed from audio."""
+    manifest["files"].pop(audio_name, None)
+    manifest["imports"][audio_name] = {
+        "source": os.path.relpath(source_path, PROJECT_DIR),
+        "source_sha256": file_sha256(source_path),
+        "elapsed_seconds": round(elapsed, 2),
+        "output": os.path.relpath(output_path, PROJECT_DIR),
+        "output_sha256": file_sha256(output_path),
+        "completed_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def record_run(manifest, started_at, files, audio_seconds, wall_seconds, workers, model):
+    run = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "files": files,
+        "workers": workers,
+        "model": model,
+        "audio_seconds": round(audio_seconds, 1),
+        "wall_seconds": round(wall_seconds, 1),
+        "audio_seconds_per_second": round(audio_seconds / wall_seconds, 2) if wall_seconds else None,
+        "files_per_hour": round(files * 3600 / wall_seconds, 1) if wall_seconds else None,
+    }
+    manifest["runs"] = (manifest.get("runs", []) + [run])[-MAX_RUNS_KEPT:]
+    return run
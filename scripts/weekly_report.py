@@ -1,41 +1,97 @@
 import os
 import asyncio
-from supabase import create_client
-from telegram import Bot
 from collections import Counter
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 
+import clients
+from clients import bot, supabase
+
 load_dotenv()
 
-supabase = create_client(os.environ["SUPABASE_URL"].strip(), os.environ["SUPABASE_KEY"].strip())
-bot = Bot(token=os.environ["TELEGRAM_TOKEN"].strip())
+IST = ZoneInfo("Asia/Kolkata")
+
 chat_id = os.environ["TELEGRAM_CHAT_ID"].strip()
 
+WINDOW_DAYS = 7
+# PostgREST/Postgres error codes meaning the sprint migration has not been applied:
+# function not found (PGRST202, 42883) or a table it reads does not exist (42P01)
+MISSING_OBJECT_CODES = {"PGRST202", "42883", "42P01"}
+
+
+def report_window(today=None):
+    """(previous week start, this week start, today) as IST dates; both weeks are 7 days."""
+    today = today or datetime.now(IST).date()
+    this_start = today - timedelta(days=WINDOW_DAYS - 1)
+    return this_start - timedelta(days=WINDOW_DAYS), this_start, today
+
+
+def fetch_window(function, start, end):
+    """Per-day, per-category aggregate rows from one of the *_window_stats functions."""
+    return supabase.rpc(function, {"p_start": start.isoformat(), "p_end": end.isoformat()}).execute().data or []
+
+
+def split_weeks(rows, this_start, key, fields):
+    """Sum rows into ({category: Counter(fields)} this week, same for the previous week)."""
+    this_week, last_week = {}, {}
+    for row in rows:
+        week = this_week if row["day"] >= this_start.isoformat() else last_week
+        totals = week.setdefault(row[key], Counter())
+        for field in fields:
+            totals[field] += row[field] or 0
+    return this_week, last_week
+
+
+def total(week, field):
+    return sum(c[field] for c in week.values())
+
+
+def delta(now, before):
+    diff = now - before
+    return f"{diff:+d}" if diff else "±0"
+
+
 async def report():
-    logs = supabase.table("daily_log")\
-        .select("*, qa_flaw_deck(error_category)")\
-        .not_.is_("caught", "null")\
-        .neq("is_revision", True)\
-        .execute()
-
-    if not logs.data:
-        await bot.send_message(chat_id=chat_id, text="No data yet for weekly report.")
+    last_start, this_start, today = report_window()
+    flaw_rows, sprint_rows = await asyncio.gather(
+        asyncio.to_thread(fetch_window, "flaw_window_stats", last_start, today),
+        asyncio.to_thread(fetch_window, "sprint_window_stats", last_start, today),
+        return_exceptions=True,
+    )
+    if isinstance(flaw_rows, Exception):
+        raise flaw_rows
+    if isinstance(sprint_rows, Exception):
+        if getattr(sprint_rows, "code", None) not in MISSING_OBJECT_CODES:
+            raise sprint_rows
+        print(f"  ⚠️ Sprint stats unavailable, leaving them out ({sprint_rows}). "
+              "Apply the sprint migrations in supabase/migrations/.")
+        sprint_rows = []
+
+    flaw, flaw_before = split_weeks(flaw_rows, this_start, "error_category", ("caught", "missed"))
+    sprint, sprint_before = split_weeks(sprint_rows, this_start, "category",
+                                        ("answers", "correct", "debt_attempts"))
+
+    if not flaw and not sprint:
+        await bot.send_message(chat_id=chat_id, text="No data for the last 7 days — nothing to report.")
         return
 
-    total = len(logs.data)
-    caught_logs = [l for l in logs.data if l["caught"]]
-    missed_logs = [l for l in logs.data if not l["caught"]]
+    caught, missed = total(flaw, "caught"), total(flaw, "missed")
+    caught_before, missed_before = total(flaw_before, "caught"), total(flaw_before, "missed")
+    missed_cats = Counter({cat: c["missed"] for cat, c in flaw.items() if c["missed"]})
+    caught_cats = Counter({cat: c["caught"] for cat, c in flaw.items() if c["caught"]})
 
-    missed_cats = Counter(l["qa_flaw_deck"]["error_category"] for l in missed_logs)
-    caught_cats = Counter(l["qa_flaw_deck"]["error_category"] for l in caught_logs)
-
-    msg = f"📊 *WEEKLY ERROR FINGERPRINT*\n\n"
-    msg += f"Attempted: {total} | Caught: {len(caught_logs)} ✅ | Missed: {len(missed_logs)} ❌\n\n"
+    msg = f"📊 *WEEKLY ERROR FINGERPRINT* ({this_start:%d %b} – {today:%d %b})\n\n"
+    msg += f"Attempted: {caught + missed} ({delta(caught + missed, caught_before + missed_before)}) | "
+    msg += f"Caught: {caught} ✅ ({delta(caught, caught_before)}) | "
+    msg += f"Missed: {missed} ❌ ({delta(missed, missed_before)})\n"
+    msg += "(changes vs the previous 7 days)\n\n"
 
     if missed_cats:
         msg += "*Your Blind Spots:*\n"
         for cat, count in missed_cats.most_common():
-            msg += f"  • {cat}: missed {count}x\n"
+            before = flaw_before.get(cat, Counter())["missed"]
+            msg += f"  • {cat}: missed {count}x ({delta(count, before)})\n"
 
     if caught_cats:
         msg += "\n*Your Strengths:*\n"
@@ -47,28 +103,19 @@ async def report():
         msg += f"\n🎯 *Fix this week:* {worst}"
 
     # ── Sprint stats ──────────────────────────────────────
-    try:
-        sprint_logs = supabase.table("sprint_logs")\
-            .select("*")\
-            .execute()
-
-        if sprint_logs.data:
-            sprint_total = len(sprint_logs.data)
-            sprint_correct = sum(1 for l in sprint_logs.data if l["is_correct"])
-            sprint_debt = sum(1 for l in sprint_logs.data if l["is_debt_attempt"])
-
-            wrong_cats = Counter(
-                l["category"] for l in sprint_logs.data if not l["is_correct"]
-            )
+    if sprint:
+        answers, correct = total(sprint, "answers"), total(sprint, "correct")
+        debt = total(sprint, "debt_attempts")
+        wrong_cats = Counter({cat: c["answers"] - c["correct"] for cat, c in sprint.items()
+                              if c["answers"] > c["correct"]})
 
-            msg += f"\n\n⚡ *SPRINT STATS (this week)*\n"
-            msg += f"Answers: {sprint_total} | Correct: {sprint_correct} | "
-            msg += f"Debt repaid: {sprint_debt}\n"
+        msg += f"\n\n⚡ *SPRINT STATS (this week)*\n"
+        msg += f"Answers: {answers} ({delta(answers, total(sprint_before, 'answers'))}) | "
+        msg += f"Correct: {correct} ({delta(correct, total(sprint_before, 'correct'))}) | "
+        msg += f"Debt repaid: {debt}\n"
 
-            if wrong_cats:
-                msg += f"Slowest category: *{wrong_cats.most_common(1)[0][0]}*"
-    except Exception:
-        pass  # Sprint tables may not exist yet
+        if wrong_cats:
+            msg += f"Slowest category: *{wrong_cats.most_common(1)[0][0]}*"
 
     try:
         await bot.send_message(chat_id=chat_id, text=msg, parse_mode="Markdown")
@@ -78,3 +125,4 @@ async def report():
         await bot.send_message(chat_id=chat_id, text=plain_msg)
 
 asyncio.run(report())
+print(clients.summary())
@@ -10,14 +10,21 @@ const BASE_URL = `https://api.telegram.org/bot${TELEGRAM_TOKEN}`
 
 const FLAW_BUTTON_KEY = 'flaw_persistent_button_v1'
 const FLAW_SESSION_KEY = 'flaw_session_v1'
-const FLAW_POLL_REGISTRY_KEY = 'flaw_poll_registry_v1'
-const FLAW_DAY_STATE_KEY = 'flaw_day_state_v1'
+const FLAW_POLL_TTL_HOURS = 48
+const FLAW_DAY_STATE_RETENTION_DAYS = 14
 
 type FlawQueueItem = {
   problem_id: string
   is_revision: boolean
 }
 
+type FlawPollMapping = {
+  session_id: string
+  problem_id: string
+  log_id: string | null
+  question_index: number
+}
+
 type FlawSession = {
   session_id: string
   selected_count: number
@@ -219,23 +226,56 @@ async function setFlawSession(session: FlawSession | null) {
   await putJsonSetting(FLAW_SESSION_KEY, session)
 }
 
-async function getPollRegistry() {
-  return await getJsonSetting<Record<string, { session_id: string, problem_id: string, log_id: string, index: number }>>(
-    FLAW_POLL_REGISTRY_KEY,
-    {}
-  )
+async function registerPoll(pollId: string, mapping: FlawPollMapping) {
+  const now = new Date()
+  await supabase
+    .from('flaw_poll_registry')
+    .delete()
+    .lt('expires_at', now.toISOString())
+  const expiresAt = new Date(now.getTime() + FLAW_POLL_TTL_HOURS * 3600 * 1000).toISOString()
+  const { error } = await supabase
+    .from('flaw_poll_registry')
+    .upsert({ poll_id: pollId, ...mapping, expires_at: expiresAt }, { onConflict: 'poll_id' })
+  if (error) {
+    throw new Error(`Failed to register flaw poll: ${error.message}`)
+  }
 }
 
-async function setPollRegistry(registry: Record<string, unknown>) {
-  await putJsonSetting(FLAW_POLL_REGISTRY_KEY, registry)
+async function lookupPoll(pollId: string) {
+  const { data } = await supabase
+    .from('flaw_poll_registry')
+    .select('session_id, problem_id, log_id, question_index')
+    .eq('poll_id', pollId)
+    .gt('expires_at', new Date().toISOString())
+    .maybeSingle()
+  return data as FlawPollMapping | null
+}
+
+// Deletes the registry row and reports whether this call was the one that
+// removed it. Telegram may redeliver a poll_answer; only the first delivery
+// claims the poll, so an answer is recorded (and counted) exactly once.
+async function claimPoll(pollId: string) {
+  const { data } = await supabase
+    .from('flaw_poll_registry')
+    .delete()
+    .eq('poll_id', pollId)
+    .select('poll_id')
+  return (data?.length ?? 0) > 0
 }
 
-async function getDayState() {
-  return await getJsonSetting<Record<string, Record<string, unknown>>>(FLAW_DAY_STATE_KEY, {})
+async function recordCategoryStat(problem: Record<string, unknown>, isCaught: boolean) {
+  const category = String(problem.error_category ?? '')
+  if (!category) return
+  const { error } = await supabase.rpc('record_flaw_answer', { p_error_category: category, p_caught: isCaught })
+  if (error) {
+    console.log(`Failed to update flaw_category_stats: ${error.message}`)
+  }
 }
 
-async function setDayState(state: Record<string, unknown>) {
-  await putJsonSetting(FLAW_DAY_STATE_KEY, state)
+function shiftIsoDate(isoDate: string, days: number) {
+  const date = new Date(`${isoDate}T00:00:00Z`)
+  date.setUTCDate(date.getUTCDate() + days)
+  return date.toISOString().slice(0, 10)
 }
 
 async function syncTodaysAnchor(dayRecord: Record<string, unknown>) {
@@ -246,15 +286,17 @@ async function syncTodaysAnchor(dayRecord: Record<string, unknown>) {
 }
 
 async function updateFlawDayState(problem: Record<string, unknown>, isCaught: boolean) {
-  const state = await getDayState()
-  const key = todayIst()
-  const record = (state[key] ?? {}) as Record<string, unknown>
-
-  record.most_recent_answered_problem_id = String(problem.id)
-  record.most_recent_answered_axiom = String(problem.trap_axiom ?? '')
-  record.most_recent_answered_caught = isCaught
-  record.most_recent_answered_error_category = String(problem.error_category ?? '')
-  record.last_answered_at = nowIsoIst()
+  // Upsert only the columns this answer changes, so concurrent answers never overwrite each other's fields
+  const day = todayIst()
+  const record: Record<string, unknown> = {
+    day,
+    most_recent_answered_problem_id: String(problem.id),
+    most_recent_answered_axiom: String(problem.trap_axiom ?? ''),
+    most_recent_answered_caught: isCaught,
+    most_recent_answered_error_category: String(problem.error_category ?? ''),
+    last_answered_at: nowIsoIst(),
+    updated_at: new Date().toISOString()
+  }
 
   if (!isCaught) {
     record.most_recent_missed_problem_id = String(problem.id)
@@ -263,16 +305,19 @@ async function updateFlawDayState(problem: Record<string, unknown>, isCaught: bo
     record.last_missed_at = nowIsoIst()
   }
 
-  state[key] = record
+  const { data: row, error } = await supabase
+    .from('flaw_day_state')
+    .upsert(record, { onConflict: 'day' })
+    .select()
+    .single()
+  if (error) console.error('flaw_day_state upsert failed:', error.message)
 
-  const sortedKeys = Object.keys(state).sort()
-  while (sortedKeys.length > 14) {
-    const oldest = sortedKeys.shift()
-    if (oldest) delete state[oldest]
-  }
+  await supabase
+    .from('flaw_day_state')
+    .delete()
+    .lt('day', shiftIsoDate(day, 1 - FLAW_DAY_STATE_RETENTION_DAYS))
 
-  await setDayState(state)
-  await syncTodaysAnchor(record)
+  await syncTodaysAnchor(row ?? record)
 }
 
 async function selectFlawProblems(count: number): Promise<FlawQueueItem[]> {
@@ -401,14 +446,12 @@ async function sendFlawQuestion(session: FlawSession) {
   session.current_log_id = String(logRow.id)
   session.current_poll_id = String(pollJson.result.poll.id)
 
-  const registry = await getPollRegistry()
-  registry[session.current_poll_id] = {
+  await registerPoll(session.current_poll_id, {
     session_id: session.session_id,
     problem_id: session.current_problem_id,
     log_id: session.current_log_id,
-    index: session.current_index
-  }
-  await setPollRegistry(registry)
+    question_index: session.current_index
+  })
   await setFlawSession(session)
 
   await editMessage(
@@ -422,7 +465,10 @@ async function sendFlawQuestion(session: FlawSession) {
 async function completeFlawSession(session: FlawSession) {
   session.completed = true
   await setFlawSession(null)
-  await setPollRegistry({})
+  await supabase
+    .from('flaw_poll_registry')
+    .delete()
+    .eq('session_id', session.session_id)
 
   await editMessage(
     session.control_chat_id,
@@ -520,8 +566,7 @@ async function handleFlawResume(cqId: string) {
 }
 
 async function handleFlawPollAnswer(pollAnswer: { poll_id: string, option_ids: number[] }) {
-  const registry = await getPollRegistry()
-  const mapping = registry[pollAnswer.poll_id]
+  const mapping = await lookupPoll(pollAnswer.poll_id)
   if (!mapping) {
     return false
   }
@@ -529,10 +574,12 @@ async function handleFlawPollAnswer(pollAnswer: { poll_id: string, option_ids: n
   const chosen = pollAnswer.option_ids
   if (!chosen || chosen.length === 0) return true
 
+  if (!(await claimPoll(pollAnswer.poll_id))) {
+    return true  // redelivered answer; the first delivery already recorded it
+  }
+
   const session = await getFlawSession()
   if (!session || session.completed || session.session_id !== mapping.session_id) {
-    delete registry[pollAnswer.poll_id]
-    await setPollRegistry(registry)
     return true
   }
 
@@ -543,8 +590,6 @@ async function handleFlawPollAnswer(pollAnswer: { poll_id: string, option_ids: n
     .single()
 
   if (!problem) {
-    delete registry[pollAnswer.poll_id]
-    await setPollRegistry(registry)
     return true
   }
 
@@ -563,13 +608,11 @@ async function handleFlawPollAnswer(pollAnswer: { poll_id: string, option_ids: n
     .eq('id', mapping.log_id)
 
   await updateFlawDayState(problem, isCaught)
+  await recordCategoryStat(problem, isCaught)
 
   const emoji = isCaught ? '✅' : '❌'
   await sendMessage(CHAT_ID, `${emoji} Recorded as ${isCaught ? 'CAUGHT' : 'MISSED'}.`)
 
-  delete registry[pollAnswer.poll_id]
-  await setPollRegistry(registry)
-
   const nextIndex = session.current_index + 1
   if (nextIndex >= session.queue.length) {
     await completeFlawSession(session)
@@ -606,7 +649,7 @@ async function handleLegacyPollAnswer(pollAnswer: { option_ids: number[] }) {
 
   const { data: problem } = await supabase
     .from('qa_flaw_deck')
-    .select('flawed_step_number, status')
+    .select('flawed_step_number, status, error_category')
     .eq('id', problemId)
     .single()
 
@@ -634,6 +677,8 @@ async function handleLegacyPollAnswer(pollAnswer: { option_ids: number[] }) {
     .update({ caught: isCaught })
     .eq('problem_id', problemId)
 
+  await recordCategoryStat(problem, isCaught)
+
   const emoji = isCaught ? '✅' : '❌'
   await sendMessage(CHAT_ID, `${emoji} Recorded as ${isCaught ? 'CAUGHT' : 'MISSED'}.`)
   console.log(`Poll answer processed: ${problemId.slice(0, 8)}... → '${newStatus}'`)
@@ -0,0 +1,23 @@
+-- Idempotent ingest: one qa_flaw_deck row per (source_file, original_problem).
+-- scripts/deck_writer.py computes the same hash and upserts with
+-- ON CONFLICT (content_hash) DO NOTHING.
+
+alter table qa_flaw_deck add column if not exists content_hash text;
+
+update qa_flaw_deck
+set content_hash = encode(sha256(convert_to(
+  coalesce(source_file, '') || E'\n' || coalesce(original_problem, ''), 'UTF8')), 'hex')
+where content_hash is null;
+
+-- Rows already duplicated by earlier reruns keep their history (daily_log
+-- references them); only the first copy claims the hash.
+update qa_flaw_deck d
+set content_hash = null
+from (
+  select id, row_number() over (partition by content_hash order by delivered_at nulls last, id) as rn
+  from qa_flaw_deck
+  where content_hash is not null
+) dup
+where d.id = dup.id and dup.rn > 1;
+
+create unique index if not exists qa_flaw_deck_content_hash_key on qa_flaw_deck (content_hash);
@@ -0,0 +1,47 @@
+-- Per-day Spot the Flaw state, replacing the 14-day JSON blob in
+-- settings.flaw_day_state_v1. One row per IST date: the webhook upserts only
+-- the columns an answer changes, readers fetch a single day, and retention is
+-- a range delete on the primary key.
+
+create table if not exists flaw_day_state (
+  day date primary key,  -- IST calendar date
+  most_recent_answered_problem_id text,
+  most_recent_answered_axiom text,
+  most_recent_answered_caught boolean,
+  most_recent_answered_error_category text,
+  last_answered_at timestamp,  -- IST wall-clock time
+  most_recent_missed_problem_id text,
+  most_recent_missed_axiom text,
+  most_recent_missed_error_category text,
+  last_missed_at timestamp,
+  updated_at timestamptz default now()
+);
+
+-- Carry over whatever the blob still holds.
+insert into flaw_day_state (
+  day,
+  most_recent_answered_problem_id, most_recent_answered_axiom, most_recent_answered_caught,
+  most_recent_answered_error_category, last_answered_at,
+  most_recent_missed_problem_id, most_recent_missed_axiom, most_recent_missed_error_category,
+  last_missed_at
+)
+select
+  d.key::date,
+  nullif(d.value->>'most_recent_answered_problem_id', ''),
+  nullif(d.value->>'most_recent_answered_axiom', ''),
+  (d.value->>'most_recent_answered_caught')::boolean,
+  nullif(d.value->>'most_recent_answered_error_category', ''),
+  nullif(d.value->>'last_answered_at', '')::timestamp,
+  nullif(d.value->>'most_recent_missed_problem_id', ''),
+  nullif(d.value->>'most_recent_missed_axiom', ''),
+  nullif(d.value->>'most_recent_missed_error_category', ''),
+  nullif(d.value->>'last_missed_at', '')::timestamp
+from settings s
+cross join lateral jsonb_each(s.value::jsonb) as d(key, value)
+where s.key = 'flaw_day_state_v1'
+  and coalesce(s.value, '') <> ''
+  and d.key ~ '^\d{4}-\d{2}-\d{2}$'
+on conflict (day) do nothing;
+
+-- The blob is no longer read or written.
+delete from settings where key = 'flaw_day_state_v1';
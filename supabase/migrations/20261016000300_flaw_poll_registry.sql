@@ -0,0 +1,36 @@
+-- Outstanding Spot the Flaw polls, replacing the JSON blob in
+-- settings.flaw_poll_registry_v1. A poll answer resolves with one primary-key
+-- lookup, sending a question inserts one row, and rows past expires_at are
+-- purged by the webhook (Telegram stops accepting answers long before then).
+
+create table if not exists flaw_poll_registry (
+  poll_id text primary key,  -- Telegram poll id
+  session_id text not null,
+  problem_id text not null,
+  log_id text,
+  question_index int not null,
+  created_at timestamptz default now(),
+  expires_at timestamptz not null default now() + interval '2 days'
+);
+
+create index if not exists flaw_poll_registry_expires_at_idx on flaw_poll_registry (expires_at);
+create index if not exists flaw_poll_registry_session_id_idx on flaw_poll_registry (session_id);
+
+-- Carry over polls the blob still holds.
+insert into flaw_poll_registry (poll_id, session_id, problem_id, log_id, question_index)
+select
+  p.key,
+  p.value->>'session_id',
+  p.value->>'problem_id',
+  nullif(p.value->>'log_id', ''),
+  coalesce((p.value->>'index')::int, 0)
+from settings s
+cross join lateral jsonb_each(s.value::jsonb) as p(key, value)
+where s.key = 'flaw_poll_registry_v1'
+  and coalesce(s.value, '') not in ('', 'null')
+  and p.value->>'session_id' is not null
+  and p.value->>'problem_id' is not null
+on conflict (poll_id) do nothing;
+
+-- The blob is no longer read or written.
+delete from settings where key = 'flaw_poll_registry_v1';
@@ -0,0 +1,47 @@
+-- Running caught/missed counts per error_category, so the morning sprint can
+-- find weak categories with one small read instead of scanning every missed
+-- daily_log row. The webhook calls record_flaw_answer() each time a flaw poll
+-- is answered; rebuild_flaw_category_stats() recomputes the table from
+-- daily_log (run once after this migration via scripts/category_stats.py).
+
+create table if not exists flaw_category_stats (
+  error_category text primary key,
+  missed int not null default 0,
+  caught int not null default 0,
+  updated_at timestamptz default now()
+);
+
+create or replace function record_flaw_answer(p_error_category text, p_caught boolean)
+returns void
+language sql
+as $$
+  insert into flaw_category_stats as s (error_category, missed, caught, updated_at)
+  values (p_error_category, case when p_caught then 0 else 1 end, case when p_caught then 1 else 0 end, now())
+  on conflict (error_category) do update
+    set missed = s.missed + excluded.missed,
+        caught = s.caught + excluded.caught,
+        updated_at = now();
+$$;
+
+create or replace function rebuild_flaw_category_stats()
+returns int
+language plpgsql
+as $$
+declare
+  n int;
+begin
+  delete from flaw_category_stats where true;
+  insert into flaw_category_stats (error_category, missed, caught, updated_at)
+  select d.error_category,
+         count(*) filter (where not l.caught),
+         count(*) filter (where l.caught),
+         now()
+  from daily_log l
+  join qa_flaw_deck d on d.id = l.problem_id
+  where l.caught is not null
+    and coalesce(d.error_category, '') <> ''
+  group by d.error_category;
+  get diagnostics n = row_count;
+  return n;
+end;
+$$;
@@ -0,0 +1,70 @@
+-- Sprint history retention. Old sprint_logs are compacted into one row per
+-- IST day and category before they and their sessions are deleted, so the
+-- weekly report keeps its history after the raw logs are gone.
+-- scripts/sprint_retention.py calls purge_sprint_history() in batches.
+
+create table if not exists sprint_daily_stats (
+  day date not null,  -- IST calendar date of the answers
+  category text not null,
+  answers int not null default 0,
+  correct int not null default 0,
+  debt_attempts int not null default 0,
+  updated_at timestamptz default now(),
+  primary key (day, category)
+);
+
+create index if not exists sprint_sessions_created_at_idx on sprint_sessions (created_at);
+create index if not exists sprint_logs_session_id_idx on sprint_logs (session_id);
+
+-- Rolls up and deletes the oldest p_batch_size sessions created more than
+-- p_keep_days ago, in one transaction. Returns the rows touched; call again
+-- until sessions_deleted is 0.
+create or replace function purge_sprint_history(p_keep_days int default 7, p_batch_size int default 500)
+returns json
+language plpgsql
+as $$
+declare
+  cutoff timestamp := (now() at time zone 'utc') - make_interval(days => p_keep_days);
+  old_ids uuid[];
+  rolled int;
+  logs_deleted int;
+  sessions_deleted int;
+begin
+  select coalesce(array_agg(id), '{}') into old_ids
+  from (
+    select id from sprint_sessions
+    where created_at < cutoff
+    order by created_at
+    limit p_batch_size
+  ) oldest;
+
+  insert into sprint_daily_stats as s (day, category, answers, correct, debt_attempts, updated_at)
+  select (l.answered_at at time zone 'utc' at time zone 'Asia/Kolkata')::date,
+         coalesce(l.category, 'unknown'),
+         count(*),
+         count(*) filter (where l.is_correct),
+         count(*) filter (where l.is_debt_attempt),
+         now()
+  from sprint_logs l
+  where l.session_id = any(old_ids)
+  group by 1, 2
+  on conflict (day, category) do update
+    set answers = s.answers + excluded.answers,
+        correct = s.correct + excluded.correct,
+        debt_attempts = s.debt_attempts + excluded.debt_attempts,
+        updated_at = now();
+  get diagnostics rolled = row_count;
+
+  delete from sprint_logs where session_id = any(old_ids);
+  get diagnostics logs_deleted = row_count;
+
+  delete from sprint_sessions where id = any(old_ids);
+  get diagnostics sessions_deleted = row_count;
+
+  return json_build_object(
+    'rollup_rows', rolled,
+    'logs_deleted', logs_deleted,
+    'sessions_deleted', sessions_deleted
+  );
+end;
+$$;
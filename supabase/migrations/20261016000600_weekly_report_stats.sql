@@ -0,0 +1,51 @@
+-- Windowed aggregates for scripts/weekly_report.py. Both functions take an
+-- inclusive range of IST dates and return one row per IST day and category,
+-- so the report can compare this week with the previous one from a single
+-- call each instead of downloading every log row.
+
+create index if not exists daily_log_delivered_at_idx on daily_log (delivered_at);
+create index if not exists sprint_logs_answered_at_idx on sprint_logs (answered_at);
+
+create or replace function flaw_window_stats(p_start date, p_end date)
+returns table (day date, error_category text, caught int, missed int)
+language sql
+stable
+as $$
+  select (l.delivered_at at time zone 'utc' at time zone 'Asia/Kolkata')::date,
+         coalesce(d.error_category, 'Unknown'),
+         (count(*) filter (where l.caught))::int,
+         (count(*) filter (where not l.caught))::int
+  from daily_log l
+  left join qa_flaw_deck d on d.id = l.problem_id
+  where l.caught is not null
+    and l.is_revision is not true
+    and l.delivered_at >= (p_start::timestamp at time zone 'Asia/Kolkata') at time zone 'utc'
+    and l.delivered_at < ((p_end + 1)::timestamp at time zone 'Asia/Kolkata') at time zone 'utc'
+  group by 1, 2;
+$$;
+
+-- Recent answers come from sprint_logs; anything older has already been
+-- rolled up into sprint_daily_stats by purge_sprint_history().
+create or replace function sprint_window_stats(p_start date, p_end date)
+returns table (day date, category text, answers int, correct int, debt_attempts int)
+language sql
+stable
+as $$
+  select day, category, sum(answers)::int, sum(correct)::int, sum(debt_attempts)::int
+  from (
+    select (l.answered_at at time zone 'utc' at time zone 'Asia/Kolkata')::date as day,
+           coalesce(l.category, 'unknown') as category,
+           count(*) as answers,
+           count(*) filter (where l.is_correct) as correct,
+           count(*) filter (where l.is_debt_attempt) as debt_attempts
+    from sprint_logs l
+    where l.answered_at >= (p_start::timestamp at time zone 'Asia/Kolkata') at time zone 'utc'
+      and l.answered_at < ((p_end + 1)::timestamp at time zone 'Asia/Kolkata') at time zone 'utc'
+    group by 1, 2
+    union all
+    select s.day, s.category, s.answers, s.correct, s.debt_attempts
+    from sprint_daily_stats s
+    where s.day between p_start and p_end
+  ) combined
+  group by day, category;
+$$;